@@ -22,20 +22,43 @@ bl_info = {
 }
 
 
-from . import prefs, keymaps, operators, ui
+import bpy
+import importlib
+import time
 
-modules = (ui, keymaps, operators, prefs)
+module_names = ("utils", "ui", "keymaps", "operators", "prefs")
+
+# Background sessions (e.g. render farms) have no editors to draw panels or handle keymaps in,
+# so only what's needed to run the operators from scripts gets loaded
+background_module_names = ("utils", "operators", "prefs")
+
+modules = []
+register_timings = []
 
 
 def register():
-    for module in modules:
+    names = background_module_names if bpy.app.background else module_names
+    register_timings.clear()
+
+    for name in names:
+        start_time = time.perf_counter()
+        module = importlib.import_module(f".{name}", __package__)
         module.register()
 
+        modules.append(module)
+        register_timings.append((name, time.perf_counter() - start_time))
+
+    if bpy.app.debug:
+        for name, elapsed in register_timings:
+            print(f"{__package__}: registered '{name}' in {elapsed * 1000:.2f}ms")
+
 
 def unregister():
     for module in modules:
         module.unregister()
 
+    modules.clear()
+
 
 if __name__ == "__main__":
     register()
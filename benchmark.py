@@ -0,0 +1,383 @@
+# Headless benchmark for the add-on's node operators.
+#
+# Usage:
+#   blender --background --factory-startup --python benchmark.py -- --sizes 10 100 1000 --output results.json
+#
+# Every operator is run through bpy.ops on freshly generated node trees, with a context override
+# pointing at a Node Editor area. Results are written as JSON so that runs can be compared across commits.
+
+import bpy
+import addon_utils
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+
+ADDON_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+ADDON_NAME = os.path.basename(ADDON_DIRECTORY)
+
+
+def parse_args():
+    argv = sys.argv[sys.argv.index("--") + 1 :] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser(description="Benchmark the add-on's NODE_OT_* operators")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--sockets", type=int, default=8, help="Number of interface sockets on generated groups")
+    parser.add_argument("--depth", type=int, default=4, help="Nesting depth of generated node groups")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--operators", nargs="*", default=None, help="Only run operators with these idnames")
+    parser.add_argument("--output", default="benchmark_results.json")
+
+    return parser.parse_args(argv)
+
+
+def enable_addon():
+    parent_directory = os.path.dirname(ADDON_DIRECTORY)
+    if parent_directory not in sys.path:
+        sys.path.insert(0, parent_directory)
+
+    addon_utils.enable(ADDON_NAME, default_set=False, handle_error=None)
+
+
+def git_revision():
+    try:
+        output = subprocess.check_output(("git", "rev-parse", "HEAD"), cwd=ADDON_DIRECTORY, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return output.decode().strip()
+
+
+def node_editor_context():
+    wm = bpy.context.window_manager
+    for window in wm.windows:
+        for area in window.screen.areas:
+            area.type = "NODE_EDITOR"
+            region = next(r for r in area.regions if r.type == "WINDOW")
+            return {"window": window, "area": area, "region": region}
+
+    raise RuntimeError("No window is available to host a Node Editor, the startup file needs at least one area")
+
+
+def new_tree(name):
+    tree = bpy.data.node_groups.new(name, "GeometryNodeTree")
+    tree.nodes.clear()
+    return tree
+
+
+def add_interface_socket(tree, name, in_out, socket_type):
+    if hasattr(tree, "interface"):
+        tree.interface.new_socket(name, in_out=in_out, socket_type=socket_type)
+    elif in_out == "INPUT":
+        tree.inputs.new(socket_type, name)
+    else:
+        tree.outputs.new(socket_type, name)
+
+
+def math_tree(size, **_):
+    tree = new_tree("BENCH_math")
+    previous = None
+
+    for i in range(size):
+        node = tree.nodes.new("ShaderNodeMath" if i % 2 else "FunctionNodeIntegerMath")
+        node.location = (i * 200, 0)
+        if previous is not None:
+            tree.links.new(previous.outputs[0], node.inputs[0])
+        previous = node
+
+    return tree
+
+
+def group_input_tree(size, sockets, **_):
+    tree = new_tree("BENCH_group_inputs")
+    for i in range(sockets):
+        add_interface_socket(tree, f"Socket {i}", "INPUT", "NodeSocketFloat")
+
+    for i in range(size):
+        group_input = tree.nodes.new("NodeGroupInput")
+        group_input.location = (0, -i * 300)
+
+        for j in range(sockets):
+            target = tree.nodes.new("ShaderNodeMath")
+            target.location = (300, -i * 300 - j * 150)
+            tree.links.new(group_input.outputs[j], target.inputs[0])
+
+    return tree
+
+
+def reroute_tree(size, **_):
+    tree = new_tree("BENCH_reroutes")
+    source = tree.nodes.new("ShaderNodeValue")
+
+    for i in range(size):
+        reroute = tree.nodes.new("NodeReroute")
+        reroute.location = (200 + (i % 7) * 40, -i * 40)
+        tree.links.new(source.outputs[0], reroute.inputs[0])
+
+    return tree
+
+
+def nested_group_tree(size, depth, **_):
+    tree = new_tree("BENCH_nested")
+
+    inner = None
+    for level in range(depth):
+        group = new_tree(f"BENCH_nested_level_{level}")
+        if inner is not None:
+            group.nodes.new("GeometryNodeGroup").node_tree = inner
+        inner = group
+
+    for i in range(size):
+        node = tree.nodes.new("GeometryNodeGroup")
+        node.node_tree = inner
+        node.location = (0, -i * 200)
+
+    return tree
+
+
+def menu_switch_tree(size, **_):
+    tree = new_tree("BENCH_menu_switches")
+    source = tree.nodes.new("GeometryNodeInputPosition")
+
+    for i in range(size):
+        switch = tree.nodes.new("GeometryNodeMenuSwitch")
+        switch.data_type = "VECTOR"
+        switch.location = (300, -i * 250)
+        tree.links.new(source.outputs[0], switch.inputs[1])
+
+        # Every other switch has the same items, so enum groups can be shared between them
+        if i % 2:
+            switch.enum_definition.enum_items.new("Extra")
+
+    return tree
+
+
+def overlapping_tree(size, **_):
+    tree = new_tree("BENCH_overlapping")
+
+    for i in range(size):
+        node = tree.nodes.new("ShaderNodeMath")
+        # Pairs of nodes sit partially on top of each other
+        node.location = ((i // 2) * 300 + (i % 2) * 60, (i % 10) * -200 - (i % 2) * 40)
+
+    return tree
+
+
+def replace_group_tree(size, depth, **_):
+    tree = nested_group_tree(size, depth)
+
+    replacement = new_tree("BENCH_replacement")
+    replacement.nodes.new("NodeGroupInput")
+    bpy.context.window_manager.nodegroup_to_replace = replacement
+
+    return tree
+
+
+def linked_group_tree(size, **_):
+    # Make Local only acts on linked groups, so a small library is written to disk and linked back in
+    library_path = os.path.join(bpy.app.tempdir, "BENCH_library.blend")
+    group = new_tree("BENCH_library_group")
+    group.nodes.new("NodeGroupInput")
+    bpy.data.libraries.write(library_path, {group})
+    bpy.data.node_groups.remove(group)
+
+    with bpy.data.libraries.load(library_path, link=True) as (data_from, data_to):
+        data_to.node_groups = ["BENCH_library_group"]
+    linked_group = data_to.node_groups[0]
+
+    tree = new_tree("BENCH_linked")
+    for i in range(size):
+        node = tree.nodes.new("GeometryNodeGroup")
+        node.node_tree = linked_group
+        node.location = (0, -i * 200)
+
+    return tree
+
+
+def select_nodes(tree, predicate=lambda node: True):
+    active = None
+    for node in tree.nodes:
+        node.select = predicate(node)
+        if node.select:
+            active = node
+
+    tree.nodes.active = active
+
+
+BATCH_ACTIONS = json.dumps([{"action": "node.split_group_input", "split_by": "LINKS"}, "node.hide_unused_sockets"])
+
+
+# (operator idname, tree generator, node selection predicate, operator properties)
+CASES = (
+    ("node.hide_unused_sockets", group_input_tree, None, {}),
+    ("node.hide_unused_sockets", group_input_tree, None, {"node_types": "ALL", "unlinked_only": True}),
+    ("node.split_group_input", group_input_tree, lambda n: n.bl_idname == "NodeGroupInput", {"split_by": "SOCKETS"}),
+    ("node.split_group_input", group_input_tree, lambda n: n.bl_idname == "NodeGroupInput", {"split_by": "LINKS"}),
+    ("node.merge_group_input", group_input_tree, lambda n: n.bl_idname == "NodeGroupInput", {}),
+    ("node.convert_math_node", math_tree, None, {}),
+    ("node.run_batch", group_input_tree, lambda n: n.bl_idname == "NodeGroupInput", {"actions": BATCH_ACTIONS}),
+    ("node.merge_reroutes_to_switch", reroute_tree, lambda n: n.bl_idname == "NodeReroute", {}),
+    ("node.multiple_asset_mark", nested_group_tree, None, {}),
+    ("node.multiple_asset_clear", nested_group_tree, None, {}),
+    ("node.multiple_fake_user_set", nested_group_tree, None, {}),
+    ("node.multiple_fake_user_clear", nested_group_tree, None, {}),
+    ("node.batch_asset_operation", nested_group_tree, None, {"action": "FAKE_USER_SET", "source": "REACHABLE"}),
+    ("node.convert_switch_type", menu_switch_tree, lambda n: n.bl_idname == "GeometryNodeMenuSwitch", {}),
+    ("node.menu_switch_to_enum", menu_switch_tree, lambda n: n.bl_idname == "GeometryNodeMenuSwitch", {}),
+    (
+        "node.menu_switch_to_enum",
+        menu_switch_tree,
+        lambda n: n.bl_idname == "GeometryNodeMenuSwitch",
+        {"all_selected": True},
+    ),
+    ("node.batch_replace_group", replace_group_tree, None, {"scope": "TREE"}),
+    ("node.multiple_make_local", linked_group_tree, None, {}),
+    ("node.multiple_make_local_all", linked_group_tree, None, {}),
+    ("node.select_overlapping_nodes", overlapping_tree, None, {}),
+    ("node.list_duplicate_groups", nested_group_tree, None, {}),
+)
+
+
+class CallCounter:
+    """
+    Counts Python and C function calls while active. RNA property access isn't visible to Python profilers,
+    so the C call count is used as the closest available proxy for the amount of RNA traffic.
+    """
+
+    def __init__(self):
+        self.python_calls = 0
+        self.c_calls = 0
+
+    def __call__(self, frame, event, arg):
+        if event == "call":
+            self.python_calls += 1
+        elif event == "c_call":
+            self.c_calls += 1
+
+    def __enter__(self):
+        sys.setprofile(self)
+        return self
+
+    def __exit__(self, *_):
+        sys.setprofile(None)
+
+
+def prepare_case(context_override, generator, predicate, size, args):
+    tree = generator(size, sockets=args.sockets, depth=args.depth)
+    select_nodes(tree, predicate or (lambda node: True))
+
+    space = context_override["area"].spaces.active
+    space.node_tree = tree
+    return tree
+
+
+def call_operator(operator, properties):
+    try:
+        return operator(**properties)
+    except RuntimeError as error:
+        return {f"ERROR: {error}"}
+
+
+def run_case(context_override, idname, generator, predicate, properties, size, args):
+    category, name = idname.split(".")
+    operator = getattr(getattr(bpy.ops, category), name)
+
+    tree = prepare_case(context_override, generator, predicate, size, args)
+    result = {
+        "operator": idname,
+        "properties": properties,
+        "size": size,
+        "nodes": len(tree.nodes),
+        "links": len(tree.links),
+    }
+
+    # The timed pass runs without tracemalloc or the profile hook, since both slow down every call
+    with bpy.context.temp_override(**context_override):
+        if not operator.poll():
+            result["status"] = "POLL_FAILED"
+            return result
+
+        start_time = time.perf_counter()
+        status = call_operator(operator, properties)
+        wall_time = time.perf_counter() - start_time
+
+    # Memory and call counts come from a second run on a freshly generated tree
+    clear_generated_data()
+    prepare_case(context_override, generator, predicate, size, args)
+
+    with bpy.context.temp_override(**context_override):
+        tracemalloc.start()
+        with CallCounter() as counter:
+            call_operator(operator, properties)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    result.update(
+        status=sorted(status),
+        wall_time=wall_time,
+        peak_memory=peak_memory,
+        python_calls=counter.python_calls,
+        c_calls=counter.c_calls,
+    )
+    return result
+
+
+def clear_generated_data():
+    for tree in tuple(bpy.data.node_groups):
+        if tree.name.startswith("BENCH_"):
+            bpy.data.node_groups.remove(tree)
+
+    for library in tuple(bpy.data.libraries):
+        if os.path.basename(library.filepath).startswith("BENCH_"):
+            bpy.data.libraries.remove(library)
+
+
+def main():
+    args = parse_args()
+    enable_addon()
+    context_override = node_editor_context()
+
+    results = []
+    for idname, generator, predicate, properties in CASES:
+        if args.operators and idname not in args.operators:
+            continue
+
+        for size in args.sizes:
+            for _ in range(args.repeat):
+                try:
+                    result = run_case(context_override, idname, generator, predicate, properties, size, args)
+                except Exception as error:
+                    # Record the failure and move on, so one broken case doesn't throw away the whole run
+                    if tracemalloc.is_tracing():
+                        tracemalloc.stop()
+                    result = {
+                        "operator": idname,
+                        "properties": properties,
+                        "size": size,
+                        "status": [f"EXCEPTION: {type(error).__name__}: {error}"],
+                    }
+                results.append(result)
+                clear_generated_data()
+
+                print(f"{idname:<32} {str(properties):<24} size={size:<6} {result.get('wall_time', 0.0):.4f}s")
+
+    report = {
+        "blender_version": bpy.app.version_string,
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    print(f"Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+import bpy
+import hashlib
+
+from bpy.types import NodeSocketVirtual
+from collections import Counter, defaultdict
+
+from . import utils
+
+
+# Properties shared by every node, which say nothing about what the node computes
+ignored_node_properties = {prop.identifier for prop in bpy.types.Node.bl_rna.properties} | {"node_tree"}
+fingerprint_property_types = {"BOOLEAN", "INT", "FLOAT", "STRING", "ENUM"}
+
+
+def property_values(data, ignored=frozenset()):
+    for prop in data.bl_rna.properties:
+        identifier = prop.identifier
+        if identifier in ignored or prop.type not in fingerprint_property_types:
+            continue
+
+        value = getattr(data, identifier, None)
+        if prop.type == "FLOAT":
+            value = tuple(round(v, 6) for v in value) if getattr(prop, "is_array", False) else round(value, 6)
+        elif getattr(prop, "is_array", False) or isinstance(value, set):
+            value = tuple(sorted(value)) if isinstance(value, set) else tuple(value)
+
+        yield identifier, value
+
+
+def interface_items(tree):
+    if hasattr(tree, "interface"):
+        for item in tree.interface.items_tree:
+            yield (
+                item.item_type,
+                item.name,
+                getattr(item, "in_out", None),
+                getattr(item, "socket_type", None),
+            )
+    else:
+        for socket in tree.inputs:
+            yield ("SOCKET", socket.name, "INPUT", socket.bl_socket_idname)
+        for socket in tree.outputs:
+            yield ("SOCKET", socket.name, "OUTPUT", socket.bl_socket_idname)
+
+
+def socket_value(socket):
+    # repr() of array values includes the owning tree's data path, so values are compared directly
+    value = getattr(socket, "default_value", None)
+
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, bpy.types.ID):
+        return value.name
+    if not isinstance(value, (str, int, bool)) and value is not None:
+        return tuple(round(v, 6) if isinstance(v, float) else v for v in value)
+    return value
+
+
+def node_description(node):
+    nested_tree = getattr(node, "node_tree", None)
+    input_values = tuple(
+        (socket.identifier, socket_value(socket))
+        for socket in node.inputs
+        if not (socket.is_linked or isinstance(socket, NodeSocketVirtual))
+    )
+
+    # Outputs of nodes like Value or RGB hold constants too, which matter precisely when they're linked
+    output_values = tuple(
+        (socket.identifier, socket_value(socket))
+        for socket in node.outputs
+        if hasattr(socket, "default_value") and not isinstance(socket, NodeSocketVirtual)
+    )
+
+    return (
+        node.bl_idname,
+        tuple(property_values(node, ignored=ignored_node_properties)),
+        input_values,
+        output_values,
+        None if nested_tree is None else fingerprint(nested_tree),
+    )
+
+
+class FingerprintCache:
+    """
+    Memoized fingerprints, keyed by tree.
+    An entry is dropped when its tree (or any group nested in it) gets updated,
+    or when a cheap size check shows the tree changed outside of the depsgraph.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.dependents = defaultdict(set)
+
+    def clear(self):
+        self.entries.clear()
+        self.dependents.clear()
+
+    def invalidate(self, tree):
+        stack = [tree]
+        while stack:
+            tree = stack.pop()
+            if self.entries.pop(tree, None) is not None:
+                stack.extend(self.dependents.pop(tree, ()))
+
+    @staticmethod
+    def signature(tree):
+        return (len(tree.nodes), len(tree.links), sum(1 for _ in interface_items(tree)))
+
+    def get(self, tree):
+        signature = self.signature(tree)
+
+        entry = self.entries.get(tree)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+
+        self.invalidate(tree)
+        value = compute_fingerprint(tree)
+        self.entries[tree] = (signature, value)
+
+        for node in tree.nodes:
+            nested_tree = getattr(node, "node_tree", None)
+            if nested_tree is not None:
+                self.dependents[nested_tree].add(tree)
+
+        return value
+
+
+fingerprint_cache = FingerprintCache()
+utils.tree_update_callbacks.append(fingerprint_cache.invalidate)
+utils.data_reload_callbacks.append(fingerprint_cache.clear)
+
+
+def compute_fingerprint(tree):
+    # Nodes are ordered by their contents rather than by name, so renaming a node doesn't change the fingerprint.
+    # Links then refer to nodes by their position in that order
+    descriptions = {node: repr(node_description(node)) for node in tree.nodes}
+    nodes = sorted(descriptions, key=descriptions.__getitem__)
+    order = {node: i for i, node in enumerate(nodes)}
+
+    links = sorted(
+        (
+            order[link.from_node],
+            link.from_socket.identifier,
+            order[link.to_node],
+            link.to_socket.identifier,
+            link.is_muted,
+        )
+        for link in tree.links
+    )
+    nodes = [descriptions[node] for node in nodes]
+
+    data = repr((tree.bl_idname, tuple(interface_items(tree)), nodes, links))
+    return hashlib.sha1(data.encode()).hexdigest()
+
+
+def fingerprint(tree):
+    """
+    Hash describing the structure of a node tree: its interface, node types, node properties and links.
+    Nested groups contribute their own fingerprint, so copies of the same group
+    (e.g. 'Group' and 'Group.001') share the same fingerprint.
+    """
+
+    return fingerprint_cache.get(tree)
+
+
+# Fingerprint and number of identical groups of every tree, as of the last duplicate_clusters() call.
+# Panels read from here, since fingerprinting every group on each redraw is far too slow.
+duplicate_scan = {}
+utils.data_reload_callbacks.append(duplicate_scan.clear)
+
+
+def duplicate_clusters(trees=None):
+    """Groups trees sharing the same fingerprint, in a single pass"""
+    if trees is None:
+        trees = bpy.data.node_groups
+
+    # Value edits in unused groups never reach the depsgraph, so memoized fingerprints can't be trusted here
+    fingerprint_cache.clear()
+
+    clusters = defaultdict(list)
+    for tree in trees:
+        clusters[fingerprint(tree)].append(tree)
+
+    duplicate_scan.clear()
+    for key, cluster in clusters.items():
+        for tree in cluster:
+            duplicate_scan[tree] = (key, len(cluster) - 1)
+
+    return {key: cluster for key, cluster in clusters.items() if len(cluster) > 1}
+
+
+def identical_groups(tree):
+    candidates = (group for group in bpy.data.node_groups if group.bl_idname == tree.bl_idname)
+    key = fingerprint(tree)
+
+    return tuple(group for group in candidates if group != tree and fingerprint(group) == key)
+
+
+class GroupUsageIndex:
+    """
+    File-wide index of which trees instance which groups, built from bpy.data.node_groups.
+    Trees reported by the depsgraph are rescanned individually, trees whose node count changed
+    are rescanned when queried, and transitive closures are only computed on request.
+    """
+
+    def __init__(self):
+        self.instances = {}
+        self.node_counts = {}
+        self.users = defaultdict(set)
+        self.closures = {}
+        self.group_count = None
+
+        # Bumped whenever the index changes, so caches built on top of it know when to reset
+        self.generation = 0
+
+    def clear(self):
+        self.instances.clear()
+        self.node_counts.clear()
+        self.users.clear()
+        self.closures.clear()
+        self.group_count = None
+        self.generation += 1
+
+    def build(self):
+        self.clear()
+        node_groups = bpy.data.node_groups
+
+        for tree in node_groups:
+            self.scan(tree)
+
+        self.group_count = len(node_groups)
+
+    def forget(self, tree):
+        for group in self.instances.pop(tree, ()):
+            self.users[group].discard(tree)
+        self.node_counts.pop(tree, None)
+
+    def scan(self, tree):
+        self.forget(tree)
+
+        instances = Counter(group for node in tree.nodes if (group := getattr(node, "node_tree", None)) is not None)
+        self.instances[tree] = instances
+        self.node_counts[tree] = len(tree.nodes)
+        for group in instances:
+            self.users[group].add(tree)
+
+        # Any closure going through this tree may have changed
+        self.closures.clear()
+        self.generation += 1
+
+    def on_tree_update(self, tree):
+        if tree in self.instances:
+            self.scan(tree)
+
+    def ensure(self, tree=None):
+        if self.group_count != len(bpy.data.node_groups):
+            self.build()
+
+        # Trees embedded in materials, worlds, etc. aren't part of bpy.data.node_groups, so they're scanned on demand
+        if tree is not None and self.node_counts.get(tree) != len(tree.nodes):
+            self.scan(tree)
+
+    def instanced_groups(self, tree):
+        """Groups instanced directly by tree, with their instance counts"""
+        self.ensure(tree)
+        return self.instances[tree]
+
+    def users_of(self, group):
+        """Trees that directly instance group"""
+        self.ensure()
+        return frozenset(self.users.get(group, ()))
+
+    def instance_count(self, group):
+        self.ensure()
+        return sum(self.instances[tree][group] for tree in self.users.get(group, ()))
+
+    def reachable(self, tree):
+        """Every group instanced by tree, directly or through nested groups"""
+        self.ensure(tree)
+
+        closure = self.closures.get(tree)
+        if closure is not None:
+            return closure
+
+        visited = set()
+        stack = [tree]
+        while stack:
+            for group in self.instanced_groups(stack.pop()):
+                if group not in visited:
+                    visited.add(group)
+                    stack.append(group)
+
+        closure = self.closures[tree] = frozenset(visited)
+        return closure
+
+    def contains(self, group, tree):
+        """Same as group.contains_tree(tree), i.e. whether tree is group itself or nested inside of it"""
+        return group == tree or tree in self.reachable(group)
+
+    def ancestors(self, tree):
+        """Every group that instances tree, directly or through nested groups"""
+        self.ensure(tree)
+
+        visited = set()
+        stack = [tree]
+        while stack:
+            for user in self.users.get(stack.pop(), ()):
+                if user not in visited:
+                    visited.add(user)
+                    stack.append(user)
+
+        return visited
+
+
+usage_index = GroupUsageIndex()
+utils.tree_update_callbacks.append(usage_index.on_tree_update)
+utils.data_reload_callbacks.append(usage_index.clear)
+
+
+class ReplaceCandidates:
+    """
+    Memoized containment checks and per-tree candidate sets for the Replace Group dropdown.
+    Everything is reset whenever the usage index's generation changes.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.generation = None
+        self.containment = {}
+        self.candidates = {}
+
+    def validate(self, tree=None):
+        self.index.ensure(tree)
+
+        if self.generation != self.index.generation:
+            self.containment.clear()
+            self.candidates.clear()
+            self.generation = self.index.generation
+
+    def contains(self, group, tree):
+        self.validate(tree)
+
+        key = (group, tree)
+        result = self.containment.get(key)
+        if result is None:
+            result = self.containment[key] = self.index.contains(group, tree)
+
+        return result
+
+    def get(self, tree, show_hidden=False):
+        """Groups that can replace group nodes in tree: same type, and not containing tree itself"""
+        self.validate(tree)
+
+        key = (tree, show_hidden)
+        candidates = self.candidates.get(key)
+        if candidates is None:
+            # Groups containing tree are exactly its ancestors, so they're excluded without checking every group
+            excluded = self.index.ancestors(tree) | {tree}
+            candidates = self.candidates[key] = frozenset(
+                group
+                for group in bpy.data.node_groups
+                if group.bl_idname == tree.bl_idname
+                and group not in excluded
+                and (show_hidden or not group.name.startswith("."))
+            )
+
+        return candidates
+
+
+replace_candidates = ReplaceCandidates(usage_index)
+
+
+def enum_items_signature(menu_switch):
+    return tuple((item.name, item.description) for item in menu_switch.enum_definition.enum_items)
+
+
+def enum_group_signature(tree):
+    """Menu items of an ENUM_ group made by Menu Switch to Enum, or None if tree isn't one"""
+    if tree.bl_idname != "GeometryNodeTree" or not tree.name.lstrip(".").startswith("ENUM_"):
+        return None
+
+    switches = tuple(node for node in tree.nodes if node.bl_idname == "GeometryNodeMenuSwitch")
+    if len(switches) != 1:
+        return None
+
+    return enum_items_signature(switches[0])
+
+
+class EnumGroupCache:
+    """
+    Existing ENUM_ groups keyed by their menu items, so that identical menus share a single group.
+    Rebuilt when the number of node groups changes, and entries are checked against their group before being reused.
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self.group_count = None
+
+    def clear(self):
+        self.groups.clear()
+        self.group_count = None
+
+    def build(self):
+        self.groups.clear()
+        node_groups = bpy.data.node_groups
+
+        for tree in node_groups:
+            signature = enum_group_signature(tree)
+            if signature is not None:
+                self.groups.setdefault(signature, tree)
+
+        self.group_count = len(node_groups)
+
+    def is_valid(self, tree, signature):
+        try:
+            return enum_group_signature(tree) == signature
+        except ReferenceError:
+            return False
+
+    def get(self, signature):
+        if self.group_count != len(bpy.data.node_groups):
+            self.build()
+
+        tree = self.groups.get(signature)
+        if tree is not None and not self.is_valid(tree, signature):
+            # The group was edited or removed since it was indexed
+            self.build()
+            tree = self.groups.get(signature)
+
+        return tree
+
+    def add(self, signature, tree):
+        self.groups[signature] = tree
+        if self.group_count is not None:
+            self.group_count += 1
+
+
+enum_group_cache = EnumGroupCache()
+utils.data_reload_callbacks.append(enum_group_cache.clear)
@@ -5,7 +5,6 @@ from typing import Dict, Iterator, Tuple
 
 from bpy.types import AddonPreferences
 from bpy.props import BoolProperty
-from rna_keymap_ui import _indented_layout, draw_km
 
 
 def ui_property_name(name: str) -> str:
@@ -136,6 +135,7 @@ class KeymapLayout:
         """
 
         self.structure = layout_structure
+        self.keymap_index = KeymapIndex()
 
         if custom_label_mappings is None:
             custom_label_mappings = {}
@@ -179,6 +179,8 @@ class KeymapLayout:
         group_spacing=0.35,
         indent_level=0,
     ):
+        from rna_keymap_ui import _indented_layout
+
         col = layout.box().column()
         kc = context.window_manager.keyconfigs.user
         display_mode = self.structure.display_mode
@@ -186,9 +188,13 @@ class KeymapLayout:
         if not collapsible_row(col, pref_data, "show_keymaps", text="Keymap List:", icon="KEYINGSET"):
             return
 
+        self.keymap_index.refresh(kc, (kmi_def.keymap_name for kmi_def in self.structure.keymap_items))
+
         if display_mode == "NESTED":
             for km_group, kmi_defs, ui_prop in self.structure.draw_items():
-                get_kmi_l = tuple(find_matching_keymaps(keyconfig=kc, keymap_item_defs=kmi_defs))
+                get_kmi_l = tuple(
+                    find_matching_keymaps(keyconfig=kc, keymap_item_defs=kmi_defs, keymap_index=self.keymap_index)
+                )
                 category_header = _indented_layout(col, indent_level)
 
                 if collapsible_row(category_header, pref_data, ui_prop, text=km_group, show_dots=True):
@@ -201,7 +207,9 @@ class KeymapLayout:
 
         elif display_mode == "FLAT":
             for km_group, kmi_defs, ui_prop in self.structure.draw_items():
-                get_kmi_l = tuple(find_matching_keymaps(keyconfig=kc, keymap_item_defs=kmi_defs))
+                get_kmi_l = tuple(
+                    find_matching_keymaps(keyconfig=kc, keymap_item_defs=kmi_defs, keymap_index=self.keymap_index)
+                )
 
                 for km, kmi in get_kmi_l:
                     col.context_pointer_set("keymap", km)
@@ -257,6 +265,9 @@ class KeymapLayout:
             row.operator("preferences.keyitem_remove", text="", icon=remove_icon).item_id = kmi.id
 
     def draw_kmi(self, display_keymaps, kc, km, kmi, layout, level):
+        # Imported here, since it's only needed once the preferences are drawn
+        from rna_keymap_ui import _indented_layout, draw_km
+
         col = _indented_layout(layout, level)
 
         if not kmi.show_expanded:
@@ -314,29 +325,84 @@ class KeymapLayout:
                     layout.context_pointer_set("keymap", km)
 
 
-def find_matching_keymaps(keyconfig, keymap_item_defs):
-    for kmi_def in keymap_item_defs:
-        keymap_name = kmi_def.keymap_name
-        kmi_idname = kmi_def.bl_idname
+class KeymapIndex:
+    def __init__(self) -> None:
+        """
+        A lookup table of keymap name -> keymap item idname -> (keymap, keymap item) pairs
+
+        It is rebuilt only when the keyconfig changes, which is detected through
+        the keyconfig itself and the item count of each indexed keymap.
+        """
+
+        self.signature = None
+        self.items: Dict[str, Dict[str, list]] = {}
+
+    @staticmethod
+    def keyconfig_signature(keyconfig, keymap_names) -> Tuple:
+        keymaps = keyconfig.keymaps
+        return (
+            keyconfig.as_pointer(),
+            tuple(len(km.keymap_items) if (km := keymaps.get(name)) else -1 for name in keymap_names),
+        )
+
+    def invalidate(self) -> None:
+        self.signature = None
+
+    def refresh(self, keyconfig, keymap_names) -> None:
+        keymap_names = tuple(sorted(set(keymap_names)))
+        signature = self.keyconfig_signature(keyconfig, keymap_names)
 
+        if signature == self.signature:
+            return
+
+        self.items = {name: {} for name in keymap_names}
         for km_con in keyconfig.keymaps:
-            if keymap_name != km_con.name:
+            idname_map = self.items.get(km_con.name)
+            if idname_map is None:
                 continue
 
             # Newer defined keymaps appear first in .keymap_items
             # To make the display order match the order of definition,
             # keymap_items must be reversed.
             for kmi_con in reversed(km_con.keymap_items):
-                if kmi_idname == kmi_con.idname:
-                    properties = kmi_def.props
+                idname_map.setdefault(kmi_con.idname, []).append((km_con, kmi_con))
+
+        self.signature = signature
+
+    def lookup(self, keymap_name: str, kmi_idname: str) -> list:
+        return self.items.get(keymap_name, {}).get(kmi_idname, [])
+
+
+def find_matching_keymaps(keyconfig, keymap_item_defs, keymap_index: KeymapIndex = None):
+    keymap_item_defs = tuple(keymap_item_defs)
+
+    # A shared index is expected to be refreshed by its owner
+    if keymap_index is None:
+        keymap_index = KeymapIndex()
+        keymap_index.refresh(keyconfig, (kmi_def.keymap_name for kmi_def in keymap_item_defs))
 
-                    if properties is None:
-                        yield (km_con, kmi_con)
-                    else:
-                        properties_match = all(v == getattr(kmi_con.properties, k) for k, v in properties.items())
+    for kmi_def in keymap_item_defs:
+        kmi_idname = kmi_def.bl_idname
+
+        for km_con, kmi_con in keymap_index.lookup(kmi_def.keymap_name, kmi_idname):
+            try:
+                # An item's idname can be edited in place, which the index signature can't detect
+                if kmi_con.idname != kmi_idname:
+                    keymap_index.invalidate()
+                    continue
+            except ReferenceError:
+                keymap_index.invalidate()
+                continue
+
+            properties = kmi_def.props
+
+            if properties is None:
+                yield (km_con, kmi_con)
+            else:
+                properties_match = all(v == getattr(kmi_con.properties, k) for k, v in properties.items())
 
-                        if properties_match:
-                            yield (km_con, kmi_con)
+                if properties_match:
+                    yield (km_con, kmi_con)
 
 
 if bpy.app.version >= (4, 1):
@@ -1,16 +1,20 @@
 import bpy
+import fnmatch
+import json
 import re
+import time
 
 from bpy.types import NodeSocketVirtual, Operator
 from bpy.props import BoolProperty, EnumProperty, StringProperty
+from bpy_extras.io_utils import ExportHelper
 
-from collections import Counter
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass, field
 from itertools import zip_longest
-from math import ceil
-from mathutils import Vector
+from math import ceil, floor
 
-from .utils import fetch_user_preferences, return_false_when
-from . import utils
+from .utils import cached_poll, fetch_user_preferences, return_false_when
+from . import groups, profiling, utils
 
 
 class NODE_OT_pin_node_editor(Operator):
@@ -49,40 +53,134 @@ class NODE_OT_hide_unused_group_inputs(Operator):
         description="Specifies on which nodes this operator gets applied on",
     )
 
+    node_types: EnumProperty(
+        name="Node Types",
+        items=(
+            ("GROUP_INPUT", "Group Inputs", "Only hide the outputs of Group Input nodes"),
+            ("GROUPS", "Groups", "Hide the sockets of Group Input and group nodes"),
+            ("ALL", "All Nodes", "Hide the sockets of every node"),
+        ),
+        default="GROUP_INPUT",
+        description="Specifies which kinds of nodes get their sockets hidden",
+    )
+
+    unlinked_only: BoolProperty(
+        name="Unlinked Only",
+        default=False,
+        description="Keep linked Group Input sockets visible too. Linked sockets of other nodes are never hidden",
+    )
+
+    all_trees: BoolProperty(
+        name="All Node Groups",
+        default=False,
+        description="Also apply operator to every node group in the file",
+    )
+
     @classmethod
+    @cached_poll(utils.tree_signature)
     @return_false_when(AttributeError)
     def poll(cls, context):
         space = context.space_data
 
         is_existing = space.edit_tree is not None
         is_node_editor = space.type == "NODE_EDITOR"
-        has_group_input = any((node.bl_idname == "NodeGroupInput") for node in space.edit_tree.nodes)
+        has_nodes = len(space.edit_tree.nodes) > 0
 
-        return all((is_existing, is_node_editor, has_group_input))
+        return all((is_existing, is_node_editor, has_nodes))
 
-    def execute(self, context):
+    @staticmethod
+    def accepts_node(node, node_types):
+        if node.bl_idname == "NodeGroupInput":
+            return True
+        if node_types == "GROUPS":
+            return node.type == "GROUP"
+        return node_types == "ALL"
+
+    @staticmethod
+    def hide_sockets(sockets, linked, unhide_virtual):
+        """Hides the given sockets in bulk, except virtual ones and those in linked. Returns how many changed."""
+        import numpy as np
+
+        count = len(sockets)
+        if count <= 0:
+            return 0
+
+        hidden = utils.read_bulk_attribute(sockets, "hide", count, dtype=bool)
+        enabled = utils.read_bulk_attribute(sockets, "enabled", count, dtype=bool)
+        new_hidden = hidden.copy()
+
+        for i, socket in enumerate(sockets):
+            if not enabled[i]:
+                continue
+
+            if socket.bl_idname == "NodeSocketVirtual":
+                if unhide_virtual:
+                    new_hidden[i] = False
+            elif socket not in linked:
+                new_hidden[i] = True
+
+        if not np.any(new_hidden != hidden):
+            return 0
+
+        # Blender refuses to change some sockets (e.g. it keeps linked ones visible), so count what actually changed
+        sockets.foreach_set("hide", new_hidden)
+        result = utils.read_bulk_attribute(sockets, "hide", count, dtype=bool)
+
+        return int(np.count_nonzero(result != hidden))
+
+    @classmethod
+    def hide_unused(cls, tree, nodes=None, node_types="GROUP_INPUT", unlinked_only=False, unhide_virtual=True):
+        if nodes is None:
+            nodes = tree.nodes
+
+        linked = utils.linked_sockets(tree) if unlinked_only or node_types != "GROUP_INPUT" else frozenset()
+        changed = 0
+
+        for node in nodes:
+            if not cls.accepts_node(node, node_types):
+                continue
+
+            # Group Inputs keep their original behavior of only having their outputs hidden,
+            # while other nodes always keep their linked sockets, so that no link ends at a hidden socket
+            if node.bl_idname == "NodeGroupInput":
+                changed += cls.hide_sockets(node.outputs, linked if unlinked_only else (), unhide_virtual)
+            else:
+                changed += cls.hide_sockets(node.inputs, linked, unhide_virtual)
+                changed += cls.hide_sockets(node.outputs, linked, unhide_virtual)
+
+        return changed
+
+    @classmethod
+    def hide_unused_in_context(cls, context, mode, node_types, unlinked_only, all_trees):
         prefs = fetch_user_preferences()
         tree = context.space_data.edit_tree
 
-        if self.mode == "SELECTED":
+        if mode == "SELECTED":
             nodes = context.selected_nodes
         else:
             nodes = tree.nodes
 
-        for node in nodes:
-            if node.bl_idname != "NodeGroupInput":
-                continue
+        options = {
+            "node_types": node_types,
+            "unlinked_only": unlinked_only,
+            "unhide_virtual": prefs.unhide_virtual_sockets,
+        }
+        changed = cls.hide_unused(tree, nodes, **options)
 
-            for output in node.outputs:
-                if not output.enabled:
+        if all_trees:
+            for group in context.blend_data.node_groups:
+                # Linked library groups can't be edited, and any change to them would be lost on reload
+                if group == tree or group.library is not None or not group.is_editable:
                     continue
 
-                if output.bl_idname != "NodeSocketVirtual":
-                    output.hide = True
-                else:
-                    if prefs.unhide_virtual_sockets:
-                        output.hide = False
+                changed += cls.hide_unused(group, **options)
+
+        return changed
 
+    def execute(self, context):
+        changed = self.hide_unused_in_context(context, self.mode, self.node_types, self.unlinked_only, self.all_trees)
+
+        self.report({"INFO"}, f"Changed visibility of {changed} sockets.")
         return {"FINISHED"}
 
 
@@ -145,6 +243,7 @@ class NODE_OT_multiple_asset_mark(Operator):
     bl_options = {"REGISTER", "UNDO_GROUPED"}
 
     @classmethod
+    @cached_poll(utils.selection_signature)
     @return_false_when(AttributeError)
     def poll(cls, context):
         group_nodes = utils.filter_group_nodes(context.selected_nodes, as_tuple=True)
@@ -166,6 +265,7 @@ class NODE_OT_multiple_asset_clear(Operator):
     bl_options = {"REGISTER", "UNDO_GROUPED"}
 
     @classmethod
+    @cached_poll(utils.selection_signature)
     @return_false_when(AttributeError)
     def poll(cls, context):
         group_nodes = utils.filter_group_nodes(context.selected_nodes, as_tuple=True)
@@ -187,6 +287,7 @@ class NODE_OT_multiple_fake_user_set(Operator):
     bl_options = {"REGISTER", "UNDO_GROUPED"}
 
     @classmethod
+    @cached_poll(utils.selection_signature)
     @return_false_when(AttributeError)
     def poll(cls, context):
         group_nodes = utils.filter_group_nodes(context.selected_nodes, as_tuple=True)
@@ -210,6 +311,7 @@ class NODE_OT_multiple_fake_user_clear(Operator):
     bl_options = {"REGISTER", "UNDO_GROUPED"}
 
     @classmethod
+    @cached_poll(utils.selection_signature)
     @return_false_when(AttributeError)
     def poll(cls, context):
         group_nodes = utils.filter_group_nodes(context.selected_nodes, as_tuple=True)
@@ -227,12 +329,110 @@ class NODE_OT_multiple_fake_user_clear(Operator):
         return {"FINISHED"}
 
 
+class NODE_OT_batch_asset_operation(Operator):
+    bl_idname = "node.batch_asset_operation"
+    bl_label = "Batch Asset Operation"
+    bl_description = "Mark, clear or set fake users on many nodegroups at once, picked from the whole file"
+    bl_options = {"REGISTER", "UNDO"}
+
+    action: EnumProperty(
+        name="Action",
+        items=(
+            ("MARK", "Mark as Assets", ""),
+            ("CLEAR", "Clear Assets", ""),
+            ("FAKE_USER_SET", "Set Fake Users", ""),
+            ("FAKE_USER_CLEAR", "Clear Fake Users", ""),
+        ),
+        default="MARK",
+    )
+
+    source: EnumProperty(
+        name="Targets",
+        items=(
+            ("SELECTED", "Selected", "Groups of the selected group nodes"),
+            ("PATTERN", "Name Pattern", "Every nodegroup in the file whose name matches the pattern"),
+            ("REACHABLE", "Reachable", "Every nodegroup used by the active tree, directly or through nested groups"),
+        ),
+        default="PATTERN",
+    )
+
+    name_pattern: StringProperty(
+        name="Name Pattern",
+        default="*",
+        description="Shell-style wildcard pattern (e.g. 'MAT_*') the nodegroup names must match",
+    )
+
+    match_tree_type: BoolProperty(
+        name="Match Tree Type",
+        default=True,
+        description="Only affect nodegroups of the same type as the active tree",
+    )
+
+    @classmethod
+    @return_false_when(AttributeError)
+    def poll(cls, context):
+        return context.space_data.edit_tree is not None
+
+    def target_groups(self, context):
+        tree = context.space_data.edit_tree
+
+        if self.source == "SELECTED":
+            targets = (node.node_tree for node in utils.filter_group_nodes(context.selected_nodes))
+        elif self.source == "PATTERN":
+            targets = (g for g in context.blend_data.node_groups if fnmatch.fnmatchcase(g.name, self.name_pattern))
+        elif self.source == "REACHABLE":
+            targets = groups.usage_index.reachable(tree)
+        else:
+            raise ValueError
+
+        targets = dict.fromkeys(targets)
+        return tuple(
+            group
+            for group in targets
+            if group.library is None and (not self.match_tree_type or group.bl_idname == tree.bl_idname)
+        )
+
+    def apply(self, group):
+        if self.action == "MARK":
+            group.asset_mark()
+        elif self.action == "CLEAR":
+            group.asset_clear()
+        elif self.action == "FAKE_USER_SET":
+            group.use_fake_user = True
+        elif self.action == "FAKE_USER_CLEAR":
+            group.use_fake_user = False
+        else:
+            raise ValueError
+
+    def execute(self, context):
+        start_time = time.perf_counter()
+        targets = self.target_groups(context)
+
+        for group in targets:
+            self.apply(group)
+
+        refresh_ui(context)
+        elapsed = time.perf_counter() - start_time
+        throughput = len(targets) / elapsed if elapsed > 0 else float("inf")
+
+        label = self.bl_rna.properties["action"].enum_items[self.action].name
+        self.report(
+            {"INFO"},
+            f"{label}: {len(targets)} nodegroups in {elapsed:.3f}s ({throughput:.0f} groups/s).",
+        )
+        return {"FINISHED"}
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+
 class NODE_OT_multiple_make_local(Operator):
     bl_idname = "node.multiple_make_local"
     bl_label = "Make Local"
     bl_options = {"REGISTER", "UNDO_GROUPED"}
 
     @classmethod
+    @cached_poll(utils.selection_signature)
     @return_false_when(AttributeError)
     def poll(cls, context):
         group_nodes = utils.filter_group_nodes(context.selected_nodes)
@@ -258,41 +458,117 @@ class NODE_OT_multiple_make_local_all(Operator):
     bl_options = {"REGISTER", "UNDO_GROUPED"}
 
     @classmethod
+    @cached_poll(utils.selection_signature)
     @return_false_when(AttributeError)
     def poll(cls, context):
         group_nodes = utils.filter_group_nodes(context.selected_nodes)
         asset_groups = tuple(n for n in group_nodes if not n.node_tree.is_editable)
         return len(asset_groups) > 0
 
+    compare_contents: BoolProperty(
+        name="Compare Contents",
+        default=False,
+        description="Only merge numbered duplicates ('.001', '.002', ...) whose contents are identical to the original",
+    )
+
+    duplicate_suffix = re.compile(r"\.\d+$")
+
+    @classmethod
+    def remove_duplicate_groups(cls, compare_contents=False):
+        # Bucket everything first, so the collection isn't renamed while it's being iterated
+        buckets = defaultdict(list)
+        for group in bpy.data.node_groups:
+            if group.library is None:
+                buckets[cls.duplicate_suffix.sub("", group.name)].append(group)
+
+        # Value edits in unused groups never reach the depsgraph, so memoized fingerprints can't be trusted here
+        if compare_contents:
+            groups.fingerprint_cache.clear()
+
+        remapped = 0
+        for base_name, duplicates in buckets.items():
+            canonical = next((group for group in duplicates if group.name == base_name), None)
+            if canonical is None:
+                canonical = min(duplicates, key=lambda group: group.name)
+                canonical.name = base_name
+
+            if len(duplicates) <= 1:
+                continue
+
+            if compare_contents:
+                canonical_fingerprint = groups.fingerprint(canonical)
+
+            for group in duplicates:
+                if group == canonical:
+                    continue
+                if compare_contents and groups.fingerprint(group) != canonical_fingerprint:
+                    continue
+
+                group.user_remap(canonical)
+                remapped += 1
+
+        return remapped
+
+    @staticmethod
+    def linked_groups(nodes):
+        group_nodes = utils.filter_group_nodes(nodes)
+        return [n.node_tree for n in group_nodes if not n.node_tree.is_editable]
+
+    @classmethod
+    def collect_dependencies(cls, nodes):
+        """Walks the linked groups reachable from nodes, visiting each group exactly once"""
+        dependencies = {}
+        skipped = 0
+
+        queue = deque(cls.linked_groups(nodes))
+        while queue:
+            group = queue.popleft()
+            if group in dependencies:
+                skipped += 1
+                continue
+
+            instanced = groups.usage_index.instanced_groups(group)
+            linked_children = [child for child in instanced.elements() if not child.is_editable]
+
+            dependencies[group] = set(linked_children)
+            queue.extend(linked_children)
+
+        return dependencies, skipped
+
     @staticmethod
-    def remove_duplicate_groups():
-        node_groups = bpy.data.node_groups
+    def dependency_order(dependencies):
+        # A group is only made local once all of the linked groups using it are local,
+        # so that make_local() remaps every user to the same local copy
+        pending_users = Counter(child for children in dependencies.values() for child in children)
+        ready = deque(group for group in dependencies if pending_users[group] == 0)
 
-        for group in node_groups:
-            unduped_name, *_ = re.split("\.\d+$", group.name)
+        while ready:
+            group = ready.popleft()
+            yield group
 
-            if unduped_name in node_groups:
-                group.user_remap(node_groups[unduped_name])
-            else:
-                group.name = unduped_name
+            for child in dependencies[group]:
+                pending_users[child] -= 1
+                if pending_users[child] == 0:
+                    ready.append(child)
 
     def make_local(self, nodes):
-        group_nodes = utils.filter_group_nodes(nodes)
-        asset_groups = tuple(n for n in group_nodes if not n.node_tree.is_editable)
+        dependencies, skipped = self.collect_dependencies(nodes)
+        order = tuple(self.dependency_order(dependencies))
 
-        for node in asset_groups:
-            group = node.node_tree
+        for group in order:
             group.make_local()
-            self.make_local(group.nodes)
 
-    def execute(self, context):
-        node_trees = tuple(tree for tree in context.blend_data.node_groups)
+        return len(order), skipped
 
-        self.make_local(context.space_data.edit_tree.nodes)
-        self.remove_duplicate_groups()
+    def execute(self, context):
+        processed, skipped = self.make_local(context.space_data.edit_tree.nodes)
+        self.remove_duplicate_groups(compare_contents=self.compare_contents)
         refresh_ui(context)
 
-        self.report({"INFO"}, f"Created local copies of {len(node_trees)} linked nodegroups.")
+        self.report(
+            {"INFO"},
+            f"Created local copies of {processed} linked nodegroups ({skipped} repeated references skipped).",
+        )
         return {"FINISHED"}
 
 
@@ -325,7 +601,35 @@ class NODE_OT_merge_reroutes_to_switch(Operator):
         return results
 
     @staticmethod
-    def switch_from_reroutes(tree, reroutes, switch_type):
+    def spatial(seq, cell_size):
+        # Reroutes are bucketed into grid cells per data type, then touching cells are joined into clusters
+        cells = defaultdict(list)
+        for reroute in seq:
+            x, y = reroute.location
+            cells[(reroute.outputs[0].type, floor(x / cell_size), floor(y / cell_size))].append(reroute)
+
+        parents = {key: key for key in cells}
+
+        def find(key):
+            while parents[key] != key:
+                parents[key] = parents[parents[key]]
+                key = parents[key]
+            return key
+
+        for data_type, cell_x, cell_y in cells:
+            for offset_x, offset_y in ((1, 0), (0, 1), (1, 1), (1, -1)):
+                neighbour = (data_type, cell_x + offset_x, cell_y + offset_y)
+                if neighbour in cells:
+                    parents[find(neighbour)] = find((data_type, cell_x, cell_y))
+
+        clusters = defaultdict(list)
+        for key, reroutes in cells.items():
+            clusters[find(key)].extend(reroutes)
+
+        return [sorted(cluster, key=lambda n: -n.location.y) for cluster in clusters.values()]
+
+    @staticmethod
+    def switch_from_reroutes(tree, reroutes, switch_type, location=None):
         if switch_type == "MENU":
             switch = tree.nodes.new("GeometryNodeMenuSwitch")
             switch_items = switch.enum_definition.enum_items
@@ -354,26 +658,56 @@ class NODE_OT_merge_reroutes_to_switch(Operator):
         for reroute_socket, switch_socket in zip(reroute_sockets, switch.inputs[1:]):
             tree.links.new(reroute_socket, switch_socket)
 
-        switch.location.x = max(r.location.x for r in reroutes) + 400
-        switch.location.y = sum(r.location.y for r in reroutes) / len(reroutes)
+        if location is None:
+            switch.location.x = max(r.location.x for r in reroutes) + 400
+            switch.location.y = sum(r.location.y for r in reroutes) / len(reroutes)
+        else:
+            switch.location = location
 
         return switch
 
-    def execute(self, context):
-        reroutes = tuple(n for n in context.selected_nodes if n.bl_idname == "NodeReroute")
-        prefs = utils.fetch_user_preferences()
-
-        func = getattr(self, prefs.reroute_merge_type.lower())
+    @classmethod
+    def merge_reroutes(cls, tree, reroutes, merge_type, switch_type, switch_count, cluster_size):
+        """Replaces groups of reroutes with switches, grouped by merge_type (ZIGZAG, BATCHED or SPATIAL)"""
+        is_spatial = merge_type == "SPATIAL"
 
         with utils.TemporaryUnframe(nodes=reroutes):
             reroutes = sorted(reroutes, key=lambda n: -n.location.y)
 
-            reroute_groups = func(reroutes, groups=prefs.switch_count)
-            tree = context.space_data.edit_tree
+            if is_spatial:
+                reroute_groups = cls.spatial(reroutes, cell_size=cluster_size)
+            else:
+                func = getattr(cls, merge_type.lower())
+                reroute_groups = func(reroutes, groups=switch_count)
 
             switches = []
             for group in reroute_groups:
-                switches.append(self.switch_from_reroutes(tree, group, switch_type=prefs.switch_type))
+                if not group:
+                    continue
+
+                location = None
+                if is_spatial:
+                    # Placed just right of the cluster's centroid, rather than past the rightmost reroute
+                    centroid_x = sum(r.location.x for r in group) / len(group)
+                    centroid_y = sum(r.location.y for r in group) / len(group)
+                    location = (centroid_x + cluster_size, centroid_y)
+
+                switches.append(cls.switch_from_reroutes(tree, group, switch_type, location=location))
+
+        return switches
+
+    def execute(self, context):
+        reroutes = tuple(n for n in context.selected_nodes if n.bl_idname == "NodeReroute")
+        prefs = utils.fetch_user_preferences()
+
+        self.merge_reroutes(
+            context.space_data.edit_tree,
+            reroutes,
+            prefs.reroute_merge_type,
+            prefs.switch_type,
+            prefs.switch_count,
+            prefs.reroute_cluster_size,
+        )
 
         return {"FINISHED"}
 
@@ -390,9 +724,10 @@ class NODE_OT_convert_switch_type(Operator):
             "GeometryNodeIndexSwitch",
         }
 
-    def execute(self, context):
-        tree = context.space_data.edit_tree
-        node = context.active_node
+    @staticmethod
+    def convert_switch(tree, node):
+        """Replaces a Menu Switch with an Index Switch or the other way around, keeping its links and values"""
+        link_index = utils.LinkIndex(tree, nodes=(node,))
 
         if node.bl_idname == "GeometryNodeMenuSwitch":
             switch = tree.nodes.new("GeometryNodeIndexSwitch")
@@ -404,17 +739,17 @@ class NODE_OT_convert_switch_type(Operator):
                 switch_items.new()
 
             for node_sock, switch_sock in zip(node.inputs[1:], switch.inputs[1:]):
-                for link in node_sock.links:
-                    tree.links.new(link.from_socket, switch_sock)
+                for link in link_index.links(node_sock):
+                    link_index.new(link.from_socket, switch_sock)
 
                 if hasattr(switch_sock, "default_value"):
                     switch_sock.default_value = node_sock.default_value
 
             for node_sock, switch_sock in zip(node.outputs, switch.outputs):
-                for link in node_sock.links:
-                    tree.links.new(switch_sock, link.to_socket)
+                for link in link_index.links(node_sock):
+                    link_index.new(switch_sock, link.to_socket)
 
-            tree.nodes.remove(node)
+            link_index.remove_node(node)
             tree.nodes.active = switch
 
         elif node.bl_idname == "GeometryNodeIndexSwitch":
@@ -427,21 +762,25 @@ class NODE_OT_convert_switch_type(Operator):
                 switch_items.new(str(i))
 
             for node_sock, switch_sock in zip(node.inputs[1:], switch.inputs[1:]):
-                for link in node_sock.links:
-                    tree.links.new(link.from_socket, switch_sock)
+                for link in link_index.links(node_sock):
+                    link_index.new(link.from_socket, switch_sock)
 
                 if hasattr(switch_sock, "default_value"):
                     switch_sock.default_value = node_sock.default_value
 
             for node_sock, switch_sock in zip(node.outputs, switch.outputs):
-                for link in node_sock.links:
-                    tree.links.new(switch_sock, link.to_socket)
+                for link in link_index.links(node_sock):
+                    link_index.new(switch_sock, link.to_socket)
 
-            tree.nodes.remove(node)
+            link_index.remove_node(node)
             tree.nodes.active = switch
         else:
             raise ValueError
 
+        return switch
+
+    def execute(self, context):
+        self.convert_switch(context.space_data.edit_tree, context.active_node)
         return {"FINISHED"}
 
 
@@ -452,6 +791,17 @@ class NODE_OT_menu_switch_to_enum(Operator):
 
     group_name: StringProperty(name="", default="", options={"SKIP_SAVE"})
     is_hidden: BoolProperty(name="Is Hidden", default=True, options={"SKIP_SAVE"})
+    all_selected: BoolProperty(
+        name="All Selected",
+        default=False,
+        description="Convert every selected Menu Switch, sharing groups between identical menus",
+        options={"SKIP_SAVE"},
+    )
+    reuse_groups: BoolProperty(
+        name="Reuse Existing Groups",
+        default=True,
+        description="Use an existing enum group with the same menu items, instead of creating a new one",
+    )
 
     def draw(self, context):
         layout = self.layout
@@ -462,6 +812,8 @@ class NODE_OT_menu_switch_to_enum(Operator):
             row.activate_init = True
             row.prop(self, "group_name")
             layout.prop(self, "is_hidden")
+            layout.prop(self, "all_selected")
+            layout.prop(self, "reuse_groups")
         else:
             row.label(icon="ERROR")
             row.label(text="No nodes selected")
@@ -499,41 +851,61 @@ class NODE_OT_menu_switch_to_enum(Operator):
 
         return group_input, group_output, new_switch
 
-    def generate_group_name(self):
-        group_name = f"ENUM_{self.group_name}"
+    def socket_name(self, menu_switch):
+        return self.group_name or menu_switch.label or menu_switch.name
+
+    def generate_group_name(self, menu_switch):
+        group_name = f"ENUM_{self.socket_name(menu_switch)}"
         if self.is_hidden:
             group_name = "." + group_name
 
         return group_name
 
-    def execute(self, context):
-        bpy.ops.node.select_all(action="DESELECT")
-
-        old_switch = context.active_node
-        groups = context.blend_data.node_groups
-        internal_tree = groups.new(self.generate_group_name(), "GeometryNodeTree")
+    def new_enum_group(self, context, old_switch):
+        node_groups = context.blend_data.node_groups
+        internal_tree = node_groups.new(self.generate_group_name(old_switch), "GeometryNodeTree")
         group_input, group_output, new_switch = self.init_internal_tree(internal_tree)
 
         self.transfer_menu_switch_items(old_switch, new_switch)
-        
+
         try:
             new_switch.inputs[0].default_value = old_switch.inputs[0].default_value
         except TypeError:
-            new_switch.inputs[0].default_value = old_switch.enum_items[0].name
+            new_switch.inputs[0].default_value = old_switch.enum_definition.enum_items[0].name
 
         self.convert_to_enum_switch(new_switch)
 
         group_sockets = internal_tree.interface
-        group_sockets.new_socket(self.group_name, in_out="INPUT", socket_type="NodeSocketMenu")
+        group_sockets.new_socket(self.socket_name(old_switch), in_out="INPUT", socket_type="NodeSocketMenu")
         group_sockets.new_socket("Output", in_out="OUTPUT", socket_type="NodeSocketInt")
 
         internal_tree.links.new(group_input.outputs[0], new_switch.inputs[0])
         internal_tree.links.new(new_switch.outputs[0], group_output.inputs[0])
 
-        tree = context.space_data.edit_tree
+        return internal_tree
+
+    def fetch_enum_group(self, context, old_switch):
+        """Returns the enum group for old_switch's menu items, and whether it was reused"""
+        signature = groups.enum_items_signature(old_switch)
+
+        if self.reuse_groups:
+            internal_tree = groups.enum_group_cache.get(signature)
+            if internal_tree is not None:
+                return internal_tree, True
+
+        internal_tree = self.new_enum_group(context, old_switch)
+        groups.enum_group_cache.add(signature, internal_tree)
+        return internal_tree, False
+
+    def convert_menu_switch(self, tree, old_switch, internal_tree, link_index):
         group_node = tree.nodes.new("GeometryNodeGroup")
         group_node.node_tree = internal_tree
-        group_node.inputs[0].default_value = new_switch.inputs[0].default_value
+
+        # The group's own default may come from another switch, so the menu value is taken from this one
+        try:
+            group_node.inputs[0].default_value = old_switch.inputs[0].default_value
+        except TypeError:
+            pass
 
         # Create index switch
         index_switch = tree.nodes.new("GeometryNodeIndexSwitch")
@@ -546,10 +918,10 @@ class NODE_OT_menu_switch_to_enum(Operator):
         # Transfer Links and properties
         utils.transfer_properties(old_switch, group_node, props=["parent", "width", "location", "label"])
         utils.transfer_properties(old_switch, index_switch, props=["parent", "location", "data_type"])
-        utils.transfer_node_links(tree, old_switch.inputs[0], group_node.inputs[0])
-        utils.transfer_node_links(tree, old_switch.outputs[0], index_switch.outputs[0])
+        utils.transfer_node_links(tree, old_switch.inputs[0], group_node.inputs[0], link_index=link_index)
+        utils.transfer_node_links(tree, old_switch.outputs[0], index_switch.outputs[0], link_index=link_index)
         for source, target in zip(old_switch.inputs[1:-1], index_switch.inputs[1:-1]):
-            utils.transfer_node_links(tree, source, target)
+            utils.transfer_node_links(tree, source, target, link_index=link_index)
             if hasattr(source, "default_value") and hasattr(target, "default_value"):
                 target.default_value = source.default_value
 
@@ -560,10 +932,40 @@ class NODE_OT_menu_switch_to_enum(Operator):
         for node in (index_switch, group_node):
             node.location.x -= total_width / 2 - old_switch.width / 2
 
-        tree.links.new(group_node.outputs[0], index_switch.inputs[0])
-        tree.nodes.remove(old_switch)
+        link_index.new(group_node.outputs[0], index_switch.inputs[0])
+        link_index.remove_node(old_switch)
+
+        return group_node
+
+    def execute(self, context):
+        if self.all_selected:
+            menu_switches = [n for n in context.selected_nodes if n.bl_idname == "GeometryNodeMenuSwitch"]
+        else:
+            menu_switches = [context.active_node]
+
+        if not menu_switches:
+            self.report({"ERROR"}, "No Menu Switch nodes selected.")
+            return {"CANCELLED"}
+
+        bpy.ops.node.select_all(action="DESELECT")
+
+        tree = context.space_data.edit_tree
+        link_index = utils.LinkIndex(tree, nodes=menu_switches)
+        reused = 0
+
+        for old_switch in menu_switches:
+            internal_tree, is_reused = self.fetch_enum_group(context, old_switch)
+            group_node = self.convert_menu_switch(tree, old_switch, internal_tree, link_index)
+            reused += is_reused
+
         tree.nodes.active = group_node
 
+        if self.all_selected or reused:
+            self.report(
+                {"INFO"},
+                f"Converted {len(menu_switches)} menu switches, reusing {reused} existing enum groups.",
+            )
+
         return {"FINISHED"}
 
     def invoke(self, context, event):
@@ -580,8 +982,138 @@ class NodeOperatorBaseclass:
         return tree_exists and is_node_editor
 
 
-# TODO - Refactor this operator to run modal (this might avoids ZeroDivisionError due to node.dimensions not being refreshed yet)
-class NODE_OT_split_group_input(NodeOperatorBaseclass, Operator):
+# Yielded by TimeSlicedOperator.steps() to wait until the editor has been redrawn
+REDRAW = object()
+
+
+class EditLog:
+    """
+    Records what a tool has changed in a tree, so that cancelling it halfway can bring the tree back.
+    Tools call record_links() before moving a socket's links, and add every node they create to created_nodes.
+    """
+
+    def __init__(self, tree, nodes):
+        self.tree = tree
+        self.link_index = utils.LinkIndex(tree)
+        self.selection = tuple(node for node in nodes if node.select)
+        self.active_node = tree.nodes.active
+        self.created_nodes = []
+        self.moved_links = []
+
+    def record_links(self, socket):
+        for link in self.link_index.links(socket):
+            from_socket, to_socket, *_ = self.link_index.endpoints[link]
+            self.moved_links.append((from_socket, to_socket, link.is_muted))
+
+    def restore(self):
+        link_index = self.link_index
+
+        for node in self.created_nodes:
+            link_index.remove_node(node)
+
+        for from_socket, to_socket, is_muted in self.moved_links:
+            link_index.new(from_socket, to_socket).is_muted = is_muted
+
+        for node in self.selection:
+            node.select = True
+        self.tree.nodes.active = self.active_node
+
+
+class TimeSlicedOperator:
+    """
+    Mixin for operators whose work is written as a generator in steps().
+    When invoked, the generator runs from a modal timer in bounded time slices, so the UI stays responsive.
+    steps() yields its progress (0.0 - 1.0) after each unit of work, or REDRAW to wait for a redraw
+    (e.g. so that node.dimensions are filled in before laying out new nodes).
+    Subclasses implement steps(context), which creates an EditLog in self._edit before changing anything,
+    so that cancelling can restore the tree to its pre-operator state.
+    """
+
+    time_budget = 1 / 60
+    timer_interval = 0.01
+
+    def execute(self, context):
+        for _ in self.steps(context):
+            pass
+
+        return {"FINISHED"}
+
+    def invoke(self, context, event):
+        wm = context.window_manager
+
+        self._steps = self.steps(context)
+        self._progress = 0.0
+        self._pending_redraws = 0
+        self._timer = wm.event_timer_add(self.timer_interval, window=context.window)
+
+        # instrument() only wraps execute(), so modal runs are recorded from here until finish()
+        self._profile_run = profiling.begin_run(self, context)
+
+        wm.modal_handler_add(self)
+        wm.progress_begin(0, 100)
+        return {"RUNNING_MODAL"}
+
+    def modal(self, context, event):
+        if event.type == "ESC":
+            self.abort(context)
+            return {"CANCELLED"}
+
+        # Everything else is blocked, since undoing, deleting nodes or switching trees mid-operation
+        # would leave steps() writing through references to nodes and sockets that no longer exist
+        if event.type != "TIMER":
+            return {"RUNNING_MODAL"}
+
+        # Timer events are handled before the window is drawn,
+        # so one extra tick is skipped to make sure a redraw actually happened
+        if self._pending_redraws > 0:
+            self._pending_redraws -= 1
+            return {"RUNNING_MODAL"}
+
+        deadline = time.perf_counter() + self.time_budget
+        try:
+            while time.perf_counter() < deadline:
+                step = next(self._steps)
+
+                if step is REDRAW:
+                    self._pending_redraws = 2
+                    break
+
+                self._progress = step
+
+        except StopIteration:
+            self.finish(context)
+            return {"FINISHED"}
+        except Exception:
+            self.abort(context)
+            raise
+
+        context.window_manager.progress_update(int(100 * self._progress))
+        context.area.header_text_set(f"{self.bl_label}: {self._progress:.0%} (Esc to cancel)")
+        context.area.tag_redraw()
+
+        return {"RUNNING_MODAL"}
+
+    def finish(self, context, result=frozenset({"FINISHED"})):
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+
+        context.area.header_text_set(None)
+        context.area.tag_redraw()
+
+        profiling.end_run(self._profile_run, result)
+
+    def abort(self, context):
+        try:
+            # Nothing has been changed yet if steps() stopped before creating its EditLog
+            edit = getattr(self, "_edit", None)
+            if edit is not None:
+                edit.restore()
+        finally:
+            self.finish(context, {"CANCELLED"})
+
+
+class NODE_OT_split_group_input(NodeOperatorBaseclass, TimeSlicedOperator, Operator):
     """Splits Group Input nodes into individual nodes based on sockets/links"""
 
     bl_idname = "node.split_group_input"
@@ -611,99 +1143,159 @@ class NODE_OT_split_group_input(NodeOperatorBaseclass, Operator):
         return has_selection
 
     @staticmethod
-    def arrange_nodes(tree, added_links, padding=0.0):
+    def arrange_nodes(tree, added_links, padding=0.0, obstacles=None):
+        import numpy as np
+
         with utils.TemporaryUnframe(tree.nodes):
-            for link in added_links:
-                node = link.from_node
-                to_socket = link.to_socket
+            _, socket_locations = utils.get_socket_locations(link.to_socket for link in added_links)
+
+            # Since this is a newly added node, all location/dimension values are (0.0, 0.0)
+            # But since the sizes of the nodes in these contexts are identical, they can be precalculated
+            node_pos_minus_socket_pos = (-140.0 - padding, 35.0)
+            locations = socket_locations + node_pos_minus_socket_pos
+
+            if obstacles is None:
+                for link, location in zip(added_links, locations):
+                    link.from_node.location = location
+                return
+
+            new_nodes = tuple(link.from_node for link in added_links)
+            geometry = utils.NodeGeometry(new_nodes, collection=tree.nodes)
+            rows = geometry.rows()
+
+            # Bounds relative to each node's own location, so they can be moved to every candidate position
+            extents = np.column_stack(
+                (
+                    geometry.lefts(rows) - geometry.location[rows, 0],
+                    geometry.rights(rows) - geometry.location[rows, 0],
+                    geometry.bottoms(rows) - geometry.location[rows, 1],
+                    geometry.tops(rows) - geometry.location[rows, 1],
+                )
+            )
+            margin = 0.5 * padding
 
-                # Since this is a newly added node, all location/dimension values are (0.0, 0.0)
-                # But since the sizes of the nodes in these contexts are identical, they can be precalculated
-                node_pos_minus_socket_pos = Vector((-140.0 - padding, 35.0))
-                node.location = utils.get_socket_location(to_socket) + node_pos_minus_socket_pos
+            for node, (x, y), (left, right, bottom, top) in zip(new_nodes, locations.tolist(), extents.tolist()):
+                rect = (x + left - margin, x + right + margin, y + bottom - margin, y + top + margin)
+                offset = obstacles.free_offset(rect, step_x=-(rect[1] - rect[0]), step_y=rect[3] - rect[2])
+                dx, dy = (0.0, 0.0) if offset is None else offset
 
-    def execute(self, context):
-        tree = utils.fetch_active_nodetree(context)
-        selected_nodes = context.selected_nodes
-        group_inputs = filter(self.is_group_input, selected_nodes)
+                node.location = (x + dx, y + dy)
+                obstacles.insert((x + dx + left, x + dx + right, y + dy + bottom, y + dy + top), node)
+
+    @staticmethod
+    def build_obstacles(tree, ignored_nodes):
+        """Spatial index of the nodes that new Group Inputs shouldn't be placed on top of"""
+        with utils.TemporaryUnframe(tree.nodes):
+            nodes = tuple(n for n in tree.nodes if n.bl_idname != "NodeFrame" and n not in ignored_nodes)
+            try:
+                return utils.SpatialGrid.from_geometry(utils.NodeGeometry(nodes, collection=tree.nodes))
+            except (ValueError, ZeroDivisionError):
+                # Nodes without a known size can't be avoided reliably, so fall back to fixed offsets
+                return None
+
+    @classmethod
+    def new_group_input(cls, edit, old_node, index, props):
+        new_node = edit.tree.nodes.new(cls.group_input_idname)
+        utils.transfer_properties(old_node, target=new_node, props=props)
+        new_node_sockets = filter(cls.is_valid_socket, new_node.outputs)
+
+        for soc in new_node_sockets:
+            soc.hide = True
+
+        new_socket = new_node.outputs[index]
+        new_socket.hide = False
+
+        edit.created_nodes.append(new_node)
+        return new_node, new_socket
+
+    def steps(self, context):
+        self._edit = EditLog(utils.fetch_active_nodetree(context), context.selected_nodes)
+        return self.split_group_inputs(self._edit, context.selected_nodes, self.split_by)
+
+    @classmethod
+    def split_group_inputs(cls, edit, selected_nodes, split_by):
+        """Generator splitting the selected Group Inputs, yielding its progress (see TimeSlicedOperator)"""
+        tree = edit.tree
+        link_index = edit.link_index
+        group_inputs = tuple(filter(cls.is_group_input, selected_nodes))
 
         # TODO - Make this controllable by user preference
         replace_selection = True
         if replace_selection:
             for node in selected_nodes:
-                if not self.is_group_input(node) or len(tuple(filter(self.is_valid_socket, node.outputs))) > 1:
+                if not cls.is_group_input(node) or len(tuple(filter(cls.is_valid_socket, node.outputs))) > 1:
                     node.select = False
 
-        for old_node in group_inputs:
-            added_nodes = []
+        total_steps = 2 * max(len(group_inputs), 1)
+        layouts = []
 
-            if self.split_by == "SOCKETS":
-                if len(tuple(filter(self.is_valid_socket, old_node.outputs))) <= 1:
+        for i, old_node in enumerate(group_inputs):
+            if split_by == "SOCKETS":
+                if len(tuple(filter(cls.is_valid_socket, old_node.outputs))) <= 1:
                     continue
 
+                added_nodes = []
                 for index, old_socket in enumerate(old_node.outputs):
-                    if not self.is_valid_socket(old_socket):
+                    if not cls.is_valid_socket(old_socket):
                         continue
 
-                    new_node = tree.nodes.new(self.group_input_idname)
-                    utils.transfer_properties(old_node, target=new_node, props=("parent", "width", "label"))
-                    new_node_sockets = filter(self.is_valid_socket, new_node.outputs)
-
-                    for soc in new_node_sockets:
-                        soc.hide = True
-
-                    new_socket = new_node.outputs[index]
-                    new_socket.hide = False
-
-                    utils.transfer_node_links(tree, old_socket, new_socket)
+                    new_node, new_socket = cls.new_group_input(edit, old_node, index, ("parent", "width", "label"))
+                    edit.record_links(old_socket)
+                    utils.transfer_node_links(tree, old_socket, new_socket, link_index=link_index)
                     added_nodes.append(new_node)
+                    yield i / total_steps
 
-                if added_nodes:
-                    utils.arrange_along_column(added_nodes, spacing=20)
-                    utils.align_by_bounding_box(target_nodes=[old_node], nodes_to_move=added_nodes)
+                layouts.append((old_node, added_nodes))
 
-                tree.nodes.remove(old_node)
-
-            elif self.split_by == "LINKS":
+            elif split_by == "LINKS":
                 added_links = []
 
-                if len(tuple(filter(self.is_valid_socket, old_node.outputs))) <= 0:
+                if len(tuple(filter(cls.is_valid_socket, old_node.outputs))) <= 0:
                     continue
 
                 for index, old_socket in enumerate(old_node.outputs):
-                    if (not self.is_valid_socket(old_socket)) or (not old_socket.links):
+                    if (not cls.is_valid_socket(old_socket)) or (not link_index.is_linked(old_socket)):
                         continue
 
-                    for link in sorted(old_socket.links, key=lambda x: -x.to_node.location.y):
-                        new_node = tree.nodes.new(self.group_input_idname)
-                        utils.transfer_properties(old_node, target=new_node, props=("width", "label"))
-                        new_node_sockets = filter(self.is_valid_socket, new_node.outputs)
-
-                        for soc in new_node_sockets:
-                            soc.hide = True
+                    edit.record_links(old_socket)
+                    for link in sorted(link_index.links(old_socket), key=lambda x: -x.to_node.location.y):
+                        new_node, new_socket = cls.new_group_input(edit, old_node, index, ("width", "label"))
 
-                        to_socket = link.to_socket
-                        new_socket = new_node.outputs[index]
-                        new_socket.hide = False
-
-                        link = tree.links.new(new_socket, to_socket)
+                        link = link_index.new(new_socket, link.to_socket)
                         new_node.parent = link.to_node.parent
                         added_links.append(link)
-                        added_nodes.append(new_node)
-
-                tree.nodes.remove(old_node)
+                        yield i / total_steps
 
-                # TODO - Make this padding controllable by user preference
-                self.arrange_nodes(tree, added_links, padding=30)
+                layouts.append((old_node, added_links))
 
             else:
                 raise ValueError
 
-        return {"FINISHED"}
+        # Layout only happens once the new nodes have been drawn, so that their dimensions are known
+        yield REDRAW
+
+        obstacles = None
+        if split_by == "LINKS":
+            # Old nodes are about to be removed, and new nodes get added to the index as they're placed
+            ignored_nodes = {old_node for old_node, _ in layouts}.union(edit.created_nodes)
+            obstacles = cls.build_obstacles(tree, ignored_nodes)
+
+        for i, (old_node, added) in enumerate(layouts, start=len(group_inputs)):
+            if split_by == "SOCKETS" and added:
+                geometry = utils.NodeGeometry((old_node, *added), collection=tree.nodes)
+                utils.arrange_along_column(added, spacing=20, geometry=geometry)
+                utils.align_by_bounding_box(target_nodes=[old_node], nodes_to_move=added, geometry=geometry)
+            elif split_by == "LINKS":
+                # TODO - Make this padding controllable by user preference
+                cls.arrange_nodes(tree, added, padding=30, obstacles=obstacles)
+
+            yield i / total_steps
 
+        for old_node, _ in layouts:
+            link_index.remove_node(old_node)
 
-# TODO - Refactor this operator to run modal (this might avoids ZeroDivisionError due to node.dimensions not being refreshed yet)
-class NODE_OT_merge_group_input(NodeOperatorBaseclass, Operator):
+
+class NODE_OT_merge_group_input(NodeOperatorBaseclass, TimeSlicedOperator, Operator):
     """Merge separate Group Input nodes into one whole node"""
 
     bl_idname = "node.merge_group_input"
@@ -731,24 +1323,40 @@ class NODE_OT_merge_group_input(NodeOperatorBaseclass, Operator):
         return has_selection
 
     def execute(self, context):
-        tree = utils.fetch_active_nodetree(context)
-        selected_nodes = context.selected_nodes
-        group_inputs = tuple(filter(self.is_group_input, selected_nodes))
+        group_inputs = tuple(filter(self.is_group_input, context.selected_nodes))
+        if len(group_inputs) <= 1:
+            return {"CANCELLED"}
 
-        active_node = context.active_node
-        has_active = active_node in group_inputs
+        return super().execute(context)
 
+    def invoke(self, context, event):
+        group_inputs = tuple(filter(self.is_group_input, context.selected_nodes))
         if len(group_inputs) <= 1:
             return {"CANCELLED"}
 
+        return super().invoke(context, event)
+
+    def steps(self, context):
+        self._edit = EditLog(utils.fetch_active_nodetree(context), context.selected_nodes)
+        return self.merge_group_inputs(self._edit, context.selected_nodes, context.active_node)
+
+    @classmethod
+    def merge_group_inputs(cls, edit, selected_nodes, active_node):
+        """Generator merging the selected Group Inputs into one, yielding its progress (see TimeSlicedOperator)"""
+        tree = edit.tree
+        link_index = edit.link_index
+        group_inputs = tuple(filter(cls.is_group_input, selected_nodes))
+        has_active = active_node in group_inputs
+
         # TODO - Make this controllable by user preference
         replace_selection = True
         if replace_selection:
             for node in selected_nodes:
-                if not self.is_group_input(node):
+                if not cls.is_group_input(node):
                     node.select = False
 
-        new_node = tree.nodes.new(self.group_input_idname)
+        new_node = tree.nodes.new(cls.group_input_idname)
+        edit.created_nodes.append(new_node)
         for socket in new_node.outputs:
             if not isinstance(socket, NodeSocketVirtual):
                 socket.hide = True
@@ -756,15 +1364,22 @@ class NODE_OT_merge_group_input(NodeOperatorBaseclass, Operator):
         target = active_node if has_active else group_inputs
         tree.nodes.active = new_node
 
-        for old_node in group_inputs:
-            for index, old_socket in filter(lambda x: self.is_valid_socket(x[1]), enumerate(old_node.outputs)):
+        for i, old_node in enumerate(group_inputs):
+            for index, old_socket in filter(lambda x: cls.is_valid_socket(x[1]), enumerate(old_node.outputs)):
                 new_socket = new_node.outputs[index]
                 new_socket.hide = old_socket.hide
 
-                utils.transfer_node_links(tree, old_socket, new_socket)
+                edit.record_links(old_socket)
+                utils.transfer_node_links(tree, old_socket, new_socket, link_index=link_index)
+
+            yield i / len(group_inputs)
+
+        # Layout only happens once the new node has been drawn, so that its dimensions are known
+        yield REDRAW
 
         with utils.TemporaryUnframe(nodes=group_inputs):
-            utils.align_by_bounding_box(target_nodes=target, nodes_to_move=new_node)
+            geometry = utils.NodeGeometry((*group_inputs, new_node), collection=tree.nodes)
+            utils.align_by_bounding_box(target_nodes=target, nodes_to_move=new_node, geometry=geometry)
 
         if has_active:
             utils.transfer_properties(active_node, target=new_node, props=("parent", "width", "label", "location"))
@@ -775,9 +1390,7 @@ class NODE_OT_merge_group_input(NodeOperatorBaseclass, Operator):
             new_node.width = sum(n.width for n in group_inputs) / len(group_inputs)
 
         for old_node in group_inputs:
-            tree.nodes.remove(old_node)
-
-        return {"FINISHED"}
+            link_index.remove_node(old_node)
 
 
 class NODE_OT_batch_replace_group(Operator):
@@ -785,7 +1398,23 @@ class NODE_OT_batch_replace_group(Operator):
     bl_label = "Batch Replace Group"
     bl_options = {"REGISTER", "UNDO"}
 
+    scope: EnumProperty(
+        name="Scope",
+        items=(
+            ("SELECTED", "Selected", "Replace the groups of the selected group nodes"),
+            ("TREE", "Current Tree", "Replace every instance of the active node's group in the current tree"),
+            (
+                "TREE_RECURSIVE",
+                "Current Tree (Recursive)",
+                "Replace every instance of the active node's group in the current tree and all groups nested in it",
+            ),
+            ("FILE", "Whole File", "Replace every instance of the active node's group in every tree of the file"),
+        ),
+        default="SELECTED",
+    )
+
     @classmethod
+    @return_false_when(AttributeError)
     def poll(cls, context):
         active_node = context.active_node
         wm = context.window_manager
@@ -795,7 +1424,7 @@ class NODE_OT_batch_replace_group(Operator):
         if group is None:
             return False
 
-        is_valid_group = group.bl_idname == tree.bl_idname and not group.contains_tree(tree)
+        is_valid_group = group.bl_idname == tree.bl_idname and not groups.replace_candidates.contains(group, tree)
 
         return all(
             (
@@ -806,13 +1435,129 @@ class NODE_OT_batch_replace_group(Operator):
             )
         )
 
+    def scope_trees(self, context):
+        tree = context.space_data.edit_tree
+
+        if self.scope == "TREE":
+            trees = (tree,)
+        elif self.scope == "TREE_RECURSIVE":
+            trees = (tree, *groups.usage_index.reachable(tree))
+        elif self.scope == "FILE":
+            trees = (*context.blend_data.node_groups, *utils.embedded_node_trees(context.blend_data))
+        else:
+            raise ValueError
+
+        return tuple(t for t in dict.fromkeys(trees) if t.library is None)
+
     def execute(self, context):
         wm = context.window_manager
-        group_nodes = utils.filter_group_nodes(context.selected_nodes, as_tuple=True)
+        replacement = wm.nodegroup_to_replace
+        start_time = time.perf_counter()
 
-        for node in group_nodes:
-            node.node_tree = wm.nodegroup_to_replace
+        if self.scope == "SELECTED":
+            group_nodes = utils.filter_group_nodes(context.selected_nodes, as_tuple=True)
+
+            for node in group_nodes:
+                node.node_tree = replacement
+
+            groups.usage_index.on_tree_update(context.space_data.edit_tree)
+            self.report({"INFO"}, f"Replaced {len(group_nodes)} group nodes.")
+            return {"FINISHED"}
+
+        # Poll can't see the scope, so an empty active group node is only rejected here
+        source = context.active_node.node_tree
+        if source is None:
+            self.report({"ERROR"}, "The active group node has no group to replace.")
+            return {"CANCELLED"}
+
+        counts = Counter()
+        skipped_trees = 0
+
+        for tree in self.scope_trees(context):
+            # Swapping the group inside a tree the replacement itself uses would make it recursive
+            if groups.replace_candidates.contains(replacement, tree):
+                skipped_trees += 1
+                continue
+
+            for node in tree.nodes:
+                if hasattr(node, "node_tree") and node.node_tree == source:
+                    node.node_tree = replacement
+                    counts[tree] += 1
+
+            # Reassigning groups doesn't change the node count the usage index checks for staleness
+            if tree in counts and tree in groups.usage_index.instances:
+                groups.usage_index.scan(tree)
+
+        elapsed = time.perf_counter() - start_time
+
+        for tree, count in counts.most_common():
+            self.report({"INFO"}, f"'{tree.name}': {count} instances")
+
+        replaced = sum(counts.values())
+        message = f"Replaced {replaced} instances of '{source.name}' in {len(counts)} trees ({elapsed:.3f}s)."
+        if skipped_trees:
+            message += f" Skipped {skipped_trees} trees used by '{replacement.name}'."
+        self.report({"INFO"}, message)
+
+        return {"FINISHED"}
+
+
+class NODE_OT_select_overlapping_nodes(NodeOperatorBaseclass, Operator):
+    bl_idname = "node.select_overlapping_nodes"
+    bl_label = "Select Overlapping Nodes"
+    bl_description = "Select every node whose bounds overlap another node"
+    bl_options = {"REGISTER", "UNDO_GROUPED"}
+
+    # Frames are meant to contain other nodes, and reroutes have no area to overlap with
+    ignored_idnames = {"NodeFrame", "NodeReroute"}
+
+    @classmethod
+    def select_overlapping(cls, tree):
+        """Selects the nodes overlapping another node and returns how many there are"""
+        with utils.TemporaryUnframe(tree.nodes):
+            nodes = tuple(n for n in tree.nodes if n.bl_idname not in cls.ignored_idnames)
+            try:
+                grid = utils.SpatialGrid.from_geometry(utils.NodeGeometry(nodes, collection=tree.nodes))
+            except (ValueError, ZeroDivisionError):
+                raise ValueError("Some nodes have not been drawn yet, so their size is unknown.")
+
+        overlapping = {grid.items[i] for pair in grid.overlapping_pairs() for i in pair}
+
+        for node in tree.nodes:
+            node.select = node in overlapping
+
+        return len(overlapping)
+
+    def execute(self, context):
+        try:
+            count = self.select_overlapping(utils.fetch_active_nodetree(context))
+        except ValueError as error:
+            self.report({"ERROR"}, str(error))
+            return {"CANCELLED"}
 
+        self.report({"INFO"}, f"Selected {count} overlapping nodes.")
+        return {"FINISHED"}
+
+
+class NODE_OT_list_duplicate_groups(Operator):
+    bl_idname = "node.list_duplicate_groups"
+    bl_label = "List Duplicate Groups"
+    bl_description = "Report clusters of node groups that are structurally identical"
+    bl_options = {"REGISTER"}
+
+    def execute(self, context):
+        clusters = groups.duplicate_clusters(context.blend_data.node_groups)
+
+        if not clusters:
+            self.report({"INFO"}, "No duplicate nodegroups found.")
+            return {"FINISHED"}
+
+        for cluster in sorted(clusters.values(), key=len, reverse=True):
+            names = ", ".join(sorted(group.name for group in cluster))
+            self.report({"INFO"}, f"{len(cluster)} identical: {names}")
+
+        redundant = sum(len(cluster) - 1 for cluster in clusters.values())
+        self.report({"INFO"}, f"Found {len(clusters)} clusters of duplicate nodegroups ({redundant} redundant).")
         return {"FINISHED"}
 
 
@@ -852,66 +1597,370 @@ class NODE_OT_convert_math_node(Operator):
         return is_valid_operation
 
     @classmethod
+    @cached_poll(utils.selection_signature)
     def poll(cls, context):
         nodes = tuple(filter(cls.is_convertable, context.selected_nodes))
 
         return len(nodes) > 0
 
-    @staticmethod
-    def convert_node(tree, node):
-        if node.bl_idname == "ShaderNodeMath":
-            switch = tree.nodes.new("FunctionNodeIntegerMath")
-            utils.transfer_properties(node, target=switch, props=("parent", "location", "hide", "width", "operation"))
-
-            for old_sock, new_sock in zip(node.inputs, switch.inputs):
-                for link in old_sock.links:
-                    new_link = tree.links.new(link.from_socket, new_sock)
-                    new_link.is_muted = link.is_muted
-
-                if hasattr(new_sock, "default_value"):
-                    new_sock.default_value = int(old_sock.default_value)
-
-            # TODO - For some reason .is_muted does not always propagate correctly, invesigate that
-            for old_sock, new_sock in zip(node.outputs, switch.outputs):
-                for link in old_sock.links:
-                    new_link = tree.links.new(new_sock, link.to_socket)
-                    new_link.is_muted = link.is_muted
-
-            tree.nodes.remove(node)
-            tree.nodes.active = switch
+    conversions = {
+        "ShaderNodeMath": ("FunctionNodeIntegerMath", int),
+        "FunctionNodeIntegerMath": ("ShaderNodeMath", float),
+    }
 
-        elif node.bl_idname == "FunctionNodeIntegerMath":
-            switch = tree.nodes.new("ShaderNodeMath")
-            utils.transfer_properties(node, target=switch, props=("parent", "location", "hide", "width", "operation"))
+    @classmethod
+    def plan_conversion(cls, nodes, link_index):
+        node_plans = []
+        link_table = {}
 
-            for old_sock, new_sock in zip(node.inputs, switch.inputs):
-                for link in old_sock.links:
-                    new_link = tree.links.new(link.from_socket, new_sock)
-                    new_link.is_muted = link.is_muted
+        for node in nodes:
+            if node.bl_idname not in cls.conversions:
+                raise ValueError
 
-                if hasattr(new_sock, "default_value"):
-                    new_sock.default_value = old_sock.default_value
+            default_values = tuple(getattr(socket, "default_value", None) for socket in node.inputs)
+            node_plans.append((node, *cls.conversions[node.bl_idname], default_values))
 
-            for old_sock, new_sock in zip(node.outputs, switch.outputs):
-                for link in old_sock.links:
-                    new_link = tree.links.new(new_sock, link.to_socket)
-                    new_link.is_muted = link.is_muted
+            # Links between two converted nodes show up on both ends, so they're keyed by the link itself
+            for link in link_index.links_of_node(node):
+                from_socket, to_socket, *_ = link_index.endpoints[link]
+                link_table[link] = (from_socket, to_socket, link.is_muted)
 
-            tree.nodes.remove(node)
-            tree.nodes.active = switch
-        else:
-            raise ValueError
+        return node_plans, tuple(link_table.values())
+
+    @classmethod
+    def convert_nodes(cls, tree, nodes, link_index=None):
+        if link_index is None:
+            link_index = utils.LinkIndex(tree)
+
+        node_plans, link_table = cls.plan_conversion(nodes, link_index)
+        socket_mapping = {}
+        new_nodes = []
+
+        for node, new_idname, convert_value, default_values in node_plans:
+            new_node = tree.nodes.new(new_idname)
+            utils.transfer_properties(node, target=new_node, props=("parent", "location", "hide", "width", "operation"))
+
+            for old_sock, new_sock, value in zip(node.inputs, new_node.inputs, default_values):
+                socket_mapping[old_sock] = new_sock
+                if value is not None and hasattr(new_sock, "default_value"):
+                    new_sock.default_value = convert_value(value)
+
+            for old_sock, new_sock in zip(node.outputs, new_node.outputs):
+                socket_mapping[old_sock] = new_sock
+
+            new_nodes.append(new_node)
+
+        # TODO - For some reason .is_muted does not always propagate correctly, invesigate that
+        for from_socket, to_socket, is_muted in link_table:
+            from_socket = socket_mapping.get(from_socket, from_socket)
+            to_socket = socket_mapping.get(to_socket, to_socket)
+
+            new_link = link_index.new(from_socket, to_socket)
+            new_link.is_muted = is_muted
+
+        for node, *_ in node_plans:
+            link_index.remove_node(node)
+
+        if new_nodes:
+            tree.nodes.active = new_nodes[-1]
+
+        return new_nodes, link_table
 
     def execute(self, context):
         tree = context.space_data.edit_tree
         nodes = tuple(filter(self.is_convertable, context.selected_nodes))
 
-        for node in nodes:
-            self.convert_node(tree, node)
+        start_time = time.perf_counter()
+        new_nodes, link_table = self.convert_nodes(tree, nodes)
+        elapsed = time.perf_counter() - start_time
+
+        self.report({"INFO"}, f"Converted {len(new_nodes)} math nodes and {len(link_table)} links in {elapsed:.3f}s.")
+        return {"FINISHED"}
+
+
+class NODE_OT_export_operator_profile(Operator, ExportHelper):
+    bl_idname = "node.export_operator_profile"
+    bl_label = "Export Operator Profile"
+    bl_description = "Save the recorded operator runs and their statistics as JSON"
+    bl_options = {"REGISTER"}
+
+    filename_ext = ".json"
+    filter_glob: StringProperty(default="*.json", options={"HIDDEN"})
+
+    @classmethod
+    def poll(cls, context):
+        return len(profiling.history) > 0
+
+    def execute(self, context):
+        count = profiling.export_json(self.filepath)
+
+        self.report({"INFO"}, f"Exported {count} operator runs to '{self.filepath}'.")
+        return {"FINISHED"}
+
+
+class NODE_OT_clear_operator_profile(Operator):
+    bl_idname = "node.clear_operator_profile"
+    bl_label = "Clear Operator Profile"
+    bl_options = {"REGISTER"}
+
+    @classmethod
+    def poll(cls, context):
+        return len(profiling.history) > 0
 
+    def execute(self, context):
+        profiling.history.clear()
+        refresh_ui(context)
         return {"FINISHED"}
 
 
+def batch_properties(operator_class, properties=None):
+    """
+    Checks properties against the operator's RNA definition,
+    and returns every property of the operator with unset ones falling back to their defaults
+    """
+
+    properties = dict(properties or {})
+    rna_properties = {prop.identifier: prop for prop in operator_class.bl_rna.properties}
+    rna_properties.pop("rna_type", None)
+
+    unknown = properties.keys() - rna_properties.keys()
+    if unknown:
+        raise ValueError(f"{operator_class.bl_idname} has no properties named {', '.join(sorted(unknown))}")
+
+    values = {}
+    for identifier, prop in rna_properties.items():
+        value = properties.get(identifier, default_property_value(prop))
+        if prop.type == "ENUM" and not prop.is_enum_flag and value not in prop.enum_items:
+            raise ValueError(f"'{value}' is not a valid value for {operator_class.bl_idname}.{identifier}")
+
+        values[identifier] = value
+
+    return values
+
+
+def default_property_value(prop):
+    if prop.type == "ENUM":
+        if prop.is_enum_flag:
+            return set(prop.default_flag)
+        return prop.default or next(iter(prop.enum_items.keys()), "")
+    if getattr(prop, "is_array", False):
+        return tuple(prop.default_array)
+    return getattr(prop, "default", None)
+
+
+# Batch actions call the same functions as the operators' execute(), with the operator's properties as arguments.
+# Each returns a message for the batch report, and raises ValueError when it can't run
+def hide_unused_sockets_action(context, mode, node_types, unlinked_only, all_trees):
+    operator = NODE_OT_hide_unused_group_inputs
+    changed = operator.hide_unused_in_context(context, mode, node_types, unlinked_only, all_trees)
+    return f"Changed visibility of {changed} sockets."
+
+
+def split_group_input_action(context, split_by):
+    edit = EditLog(utils.fetch_active_nodetree(context), context.selected_nodes)
+    for _ in NODE_OT_split_group_input.split_group_inputs(edit, context.selected_nodes, split_by):
+        pass
+
+    return f"Added {len(edit.created_nodes)} Group Input nodes."
+
+
+def merge_group_input_action(context):
+    operator = NODE_OT_merge_group_input
+    if len(tuple(filter(operator.is_group_input, context.selected_nodes))) <= 1:
+        raise ValueError("At least two Group Input nodes need to be selected")
+
+    edit = EditLog(utils.fetch_active_nodetree(context), context.selected_nodes)
+    for _ in operator.merge_group_inputs(edit, context.selected_nodes, context.active_node):
+        pass
+
+    return None
+
+
+def convert_math_node_action(context):
+    operator = NODE_OT_convert_math_node
+    nodes = tuple(filter(operator.is_convertable, context.selected_nodes))
+    new_nodes, link_table = operator.convert_nodes(context.space_data.edit_tree, nodes)
+    return f"Converted {len(new_nodes)} math nodes and {len(link_table)} links."
+
+
+def merge_reroutes_to_switch_action(context):
+    reroutes = tuple(n for n in context.selected_nodes if n.bl_idname == "NodeReroute")
+    prefs = utils.fetch_user_preferences()
+
+    switches = NODE_OT_merge_reroutes_to_switch.merge_reroutes(
+        context.space_data.edit_tree,
+        reroutes,
+        prefs.reroute_merge_type,
+        prefs.switch_type,
+        prefs.switch_count,
+        prefs.reroute_cluster_size,
+    )
+    return f"Added {len(switches)} switches."
+
+
+def convert_switch_type_action(context):
+    NODE_OT_convert_switch_type.convert_switch(context.space_data.edit_tree, context.active_node)
+    return None
+
+
+def select_overlapping_nodes_action(context):
+    count = NODE_OT_select_overlapping_nodes.select_overlapping(utils.fetch_active_nodetree(context))
+    return f"Selected {count} overlapping nodes."
+
+
+@dataclass(slots=True)
+class BatchStep:
+    action: str
+    result: str
+    wall_time: float
+    nodes_before: int
+    nodes_after: int
+    links_before: int
+    links_after: int
+    reports: list = field(default_factory=list)
+    error: str = None
+
+
+# Tools that only need a Node Editor context, so they can be chained by run_batch(), with the operator
+# whose poll() and properties they share
+batch_actions = {
+    operator.bl_idname: (operator, function)
+    for operator, function in (
+        (NODE_OT_hide_unused_group_inputs, hide_unused_sockets_action),
+        (NODE_OT_split_group_input, split_group_input_action),
+        (NODE_OT_merge_group_input, merge_group_input_action),
+        (NODE_OT_convert_math_node, convert_math_node_action),
+        (NODE_OT_merge_reroutes_to_switch, merge_reroutes_to_switch_action),
+        (NODE_OT_convert_switch_type, convert_switch_type_action),
+        (NODE_OT_select_overlapping_nodes, select_overlapping_nodes_action),
+    )
+}
+
+
+def parse_batch_actions(data):
+    """
+    Reads a list of actions, each either an operator idname
+    or a dict with an "action" idname and that operator's properties,
+    e.g. '[{"action": "node.split_group_input", "split_by": "LINKS"}, "node.convert_math_node"]'
+    """
+
+    if isinstance(data, str):
+        data = json.loads(data)
+    if not isinstance(data, list):
+        raise TypeError("Batch actions must be a list")
+
+    actions = []
+    for item in data:
+        if isinstance(item, str):
+            item = {"action": item}
+        elif not isinstance(item, dict):
+            raise TypeError(f"Invalid batch action: {item!r}")
+
+        properties = dict(item)
+        idname = properties.pop("action", None)
+        if idname not in batch_actions:
+            raise ValueError(f"Unknown batch action: {idname!r}, expected one of {', '.join(batch_actions)}")
+
+        actions.append((idname, properties))
+
+    return actions
+
+
+def run_batch(context, actions):
+    """
+    Runs each (idname, properties) action in order, in-process and without undo pushes,
+    stopping at the first one that fails. Returns a BatchStep for every action that ran.
+    Callers outside of an operator with UNDO are responsible for pushing their own undo step.
+    """
+
+    # Every action is checked before running anything, so a typo doesn't leave the tree half-edited
+    prepared = []
+    for idname, properties in actions:
+        operator, function = batch_actions[idname]
+        prepared.append((idname, operator, function, batch_properties(operator, properties)))
+
+    steps = []
+
+    for idname, operator, function, properties in prepared:
+        tree = context.space_data.edit_tree
+        nodes_before, links_before = len(tree.nodes), len(tree.links)
+        result, error, reports = {"CANCELLED"}, None, []
+
+        start_time = time.perf_counter()
+        try:
+            if not operator.poll(context):
+                error = "Operator can't run in the current context"
+            else:
+                message = function(context, **properties)
+                result = {"FINISHED"}
+                if message is not None:
+                    reports.append(("INFO", message))
+        except (AttributeError, ReferenceError, RuntimeError, TypeError, ValueError) as exception:
+            error = f"{type(exception).__name__}: {exception}"
+        wall_time = time.perf_counter() - start_time
+
+        steps.append(
+            BatchStep(
+                action=idname,
+                result=",".join(sorted(result)),
+                wall_time=wall_time,
+                nodes_before=nodes_before,
+                nodes_after=len(tree.nodes),
+                links_before=links_before,
+                links_after=len(tree.links),
+                reports=reports,
+                error=error,
+            )
+        )
+
+        if error is not None:
+            break
+
+    return steps
+
+
+class NODE_OT_run_batch(NodeOperatorBaseclass, Operator):
+    """
+    Run a list of node tools one after another, as a single undo step.
+    The batch stops at the first tool that fails, keeping the changes of the tools before it
+    """
+
+    bl_idname = "node.run_batch"
+    bl_label = "Run Batch"
+    bl_options = {"REGISTER", "UNDO"}
+
+    actions: StringProperty(
+        name="Actions",
+        default="[]",
+        description="JSON list of actions, each an operator idname "
+        "or a dict with an 'action' idname and its properties",
+    )
+
+    def execute(self, context):
+        try:
+            actions = parse_batch_actions(self.actions)
+            steps = run_batch(context, actions)
+        except (TypeError, ValueError) as error:
+            self.report({"ERROR"}, str(error))
+            return {"CANCELLED"}
+
+        for i, step in enumerate(steps, start=1):
+            self.report(
+                {"INFO"},
+                f"{i}. {step.action}: {step.result} in {step.wall_time:.3f}s, "
+                f"nodes {step.nodes_before} -> {step.nodes_after}, links {step.links_before} -> {step.links_after}",
+            )
+            for report_type, message in step.reports:
+                self.report({report_type}, f"{step.action}: {message}")
+
+        failed = next((step for step in steps if step.error is not None or step.result != "FINISHED"), None)
+        if failed is not None:
+            # Earlier steps have already been applied, and are kept as part of this undo step
+            self.report({"ERROR"}, f"Batch stopped at {failed.action}: {failed.error or failed.result}")
+
+        return {"FINISHED"} if steps else {"CANCELLED"}
+
+
 def refresh_ui(context):
     for region in context.area.regions:
         region.tag_redraw()
@@ -927,6 +1976,7 @@ classes = (
     NODE_OT_multiple_asset_clear,
     NODE_OT_multiple_fake_user_set,
     NODE_OT_multiple_fake_user_clear,
+    NODE_OT_batch_asset_operation,
     NODE_OT_merge_reroutes_to_switch,
     NODE_OT_convert_switch_type,
     NODE_OT_menu_switch_to_enum,
@@ -936,14 +1986,50 @@ classes = (
     NODE_OT_multiple_make_local,
     NODE_OT_multiple_make_local_all,
     NODE_OT_batch_replace_group,
+    NODE_OT_list_duplicate_groups,
+    NODE_OT_select_overlapping_nodes,
+    NODE_OT_run_batch,
+    NODE_OT_export_operator_profile,
+    NODE_OT_clear_operator_profile,
+)
+
+profiler_classes = (
+    NODE_OT_export_operator_profile,
+    NODE_OT_clear_operator_profile,
 )
 
 
+def replace_nodegroup_poll(self, object):
+    # Scripts (e.g. in background sessions) can assign the group without a Node Editor in context,
+    # in which case Batch Replace Group's own poll still checks it against the edited tree
+    tree = getattr(bpy.context.space_data, "edit_tree", None)
+    if tree is None:
+        return True
+
+    show_hidden = fetch_user_preferences("show_hidden_nodegroups")
+
+    return object in groups.replace_candidates.get(tree, show_hidden)
+
+
 def register():
     for cls in classes:
+        if cls not in profiler_classes:
+            profiling.instrument(cls)
         bpy.utils.register_class(cls)
 
+    # Registered here rather than with the panels, since Batch Replace Group also runs in background sessions
+    bpy.types.WindowManager.nodegroup_to_replace = bpy.props.PointerProperty(
+        name="Group to Replace",
+        type=bpy.types.NodeTree,
+        poll=replace_nodegroup_poll,
+    )
+
 
 def unregister():
+    del bpy.types.WindowManager.nodegroup_to_replace
+
     for cls in classes:
         bpy.utils.unregister_class(cls)
+        profiling.uninstrument(cls)
+
+    profiling.stop_tracing()
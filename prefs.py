@@ -1,6 +1,7 @@
 import bpy
-from bpy.props import BoolProperty, EnumProperty, IntProperty
+from bpy.props import BoolProperty, EnumProperty, FloatProperty, IntProperty
 
+from . import profiling
 from .keymaps import keymap_layout
 
 
@@ -18,7 +19,19 @@ class PBTweaksPreferences(bpy.types.AddonPreferences):
         default=False,
         description="Show Hidden Nodegroups",
     )
-    
+
+    def update_profiling(self, context):
+        if not self.enable_profiling:
+            profiling.stop_tracing()
+
+    enable_profiling: BoolProperty(
+        name="Profile Operators",
+        default=False,
+        description="Record the run time and node/link changes of every operator run, "
+        "shown in the Operator Profile panel",
+        update=update_profiling,
+    )
+
     switch_count: IntProperty(
         name="No. of Switches",
         default=1,
@@ -47,11 +60,24 @@ class PBTweaksPreferences(bpy.types.AddonPreferences):
                 "Interweave subsequent reroutes to different switches",
             ),
             ("BATCHED", "Batched", "Clump subsequent reroutes to different switches"),
+            (
+                "SPATIAL",
+                "Spatial",
+                "Give each cluster of nearby reroutes with the same data type its own switch",
+            ),
         ),
         default="BATCHED",
         description="How the reroutes are going to be linked to their respective switch nodes",
     )
 
+    reroute_cluster_size: FloatProperty(
+        name="Cluster Size",
+        default=300.0,
+        min=10.0,
+        soft_max=2000.0,
+        description="Reroutes closer than this distance end up in the same cluster when using spatial merging",
+    )
+
     def draw_enum_property(self, layout, prop_name):
         prop_label = self.__annotations__[prop_name].keywords["name"]
         layout.label(text=f"{prop_label}:")
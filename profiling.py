@@ -0,0 +1,237 @@
+import json
+import time
+import tracemalloc
+
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+from functools import wraps
+
+from . import utils
+from .utils import fetch_user_preferences
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileRecord:
+    operator: str
+    tree: str
+    result: str
+    wall_time: float
+    nodes_before: int
+    nodes_after: int
+    links_before: int
+    links_after: int
+    nodes_created: int
+    nodes_removed: int
+    links_created: int
+    links_removed: int
+    allocated: int
+    peak_allocated: int
+
+
+history = deque(maxlen=500)
+original_executes = {}
+
+# Only tracing started here gets stopped here, so other tools using tracemalloc aren't affected
+started_tracing = False
+
+
+def fetch_tree(context):
+    space = getattr(context, "space_data", None)
+    return getattr(space, "edit_tree", None)
+
+
+def tree_contents(tree):
+    # Nodes and links hash by pointer, so this doesn't go through any RNA properties
+    if tree is None:
+        return frozenset(), frozenset()
+
+    return frozenset(tree.nodes), frozenset(tree.links)
+
+
+def is_enabled():
+    try:
+        return fetch_user_preferences("enable_profiling")
+    except (AttributeError, KeyError):
+        return False
+
+
+def start_tracing():
+    global started_tracing
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracing = True
+
+
+def stop_tracing():
+    global started_tracing
+    if started_tracing and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    started_tracing = False
+
+
+@dataclass(slots=True)
+class ProfileRun:
+    operator: str
+    tree: object
+    tree_name: str
+    nodes_before: frozenset
+    links_before: frozenset
+    memory_before: int
+    start_time: float
+
+
+# Operators called from inside a profiled run (e.g. the steps of Run Batch) are part of that run.
+# Recording them separately would also reset the peak the outer run is measuring
+active_runs = 0
+
+
+def begin_run(operator, context):
+    """Starts measuring a run of operator. Returns None when it shouldn't be recorded."""
+    global active_runs
+
+    if not is_enabled():
+        stop_tracing()
+        return None
+
+    if active_runs > 0:
+        return None
+
+    tree = fetch_tree(context)
+    nodes_before, links_before = tree_contents(tree)
+
+    start_tracing()
+    tracemalloc.reset_peak()
+    memory_before, _ = tracemalloc.get_traced_memory()
+
+    active_runs += 1
+    return ProfileRun(
+        operator=operator.bl_idname,
+        tree=tree,
+        tree_name=getattr(tree, "name", ""),
+        nodes_before=nodes_before,
+        links_before=links_before,
+        memory_before=memory_before,
+        start_time=time.perf_counter(),
+    )
+
+
+def end_run(run, result):
+    global active_runs
+
+    if run is None:
+        return
+
+    wall_time = time.perf_counter() - run.start_time
+    active_runs -= 1
+
+    if tracemalloc.is_tracing():
+        memory_after, memory_peak = tracemalloc.get_traced_memory()
+    else:
+        memory_after = memory_peak = run.memory_before
+
+    try:
+        nodes_after, links_after = tree_contents(run.tree)
+    except ReferenceError:
+        nodes_after, links_after = frozenset(), frozenset()
+
+    history.append(
+        ProfileRecord(
+            operator=run.operator,
+            tree=run.tree_name,
+            result=",".join(sorted(result)),
+            wall_time=wall_time,
+            nodes_before=len(run.nodes_before),
+            nodes_after=len(nodes_after),
+            links_before=len(run.links_before),
+            links_after=len(links_after),
+            nodes_created=len(nodes_after - run.nodes_before),
+            nodes_removed=len(run.nodes_before - nodes_after),
+            links_created=len(links_after - run.links_before),
+            links_removed=len(run.links_before - links_after),
+            allocated=memory_after - run.memory_before,
+            peak_allocated=memory_peak - run.memory_before,
+        )
+    )
+
+
+def reset_runs():
+    # A modal run whose handler Blender drops (e.g. when loading a file) never reaches end_run()
+    global active_runs
+    active_runs = 0
+
+
+utils.data_reload_callbacks.append(reset_runs)
+
+
+def profiled(execute):
+    """Records wall time, node/link changes and Python allocations of each execute() call"""
+
+    @wraps(execute)
+    def wrapper(self, context):
+        run = begin_run(self, context)
+        result = {"CANCELLED"}
+
+        try:
+            result = execute(self, context)
+        finally:
+            end_run(run, result)
+
+        return result
+
+    return wrapper
+
+
+def instrument(cls):
+    execute = getattr(cls, "execute", None)
+    if execute is None or cls in original_executes:
+        return
+
+    original_executes[cls] = cls.__dict__.get("execute")
+    cls.execute = profiled(execute)
+
+
+def uninstrument(cls):
+    if cls not in original_executes:
+        return
+
+    execute = original_executes.pop(cls)
+    if execute is None:
+        del cls.execute
+    else:
+        cls.execute = execute
+
+
+def percentile(sorted_values, fraction):
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def operator_statistics():
+    timings = defaultdict(list)
+    for record in history:
+        timings[record.operator].append(record.wall_time)
+
+    statistics = {}
+    for operator, values in timings.items():
+        values.sort()
+        statistics[operator] = {
+            "runs": len(values),
+            "p50": percentile(values, 0.5),
+            "p90": percentile(values, 0.9),
+            "p99": percentile(values, 0.99),
+            "max": values[-1],
+        }
+
+    return statistics
+
+
+def export_json(filepath):
+    data = {
+        "runs": [asdict(record) for record in history],
+        "statistics": operator_statistics(),
+    }
+
+    with open(filepath, "w") as file:
+        json.dump(data, file, indent=2)
+
+    return len(history)
@@ -1,11 +1,10 @@
 import bpy
 from bpy.types import Panel
 
-from . import utils
+from . import groups, profiling, utils
 from .utils import fetch_user_preferences, return_false_when
 
 import itertools
-from rna_keymap_ui import _indented_layout
 
 
 def draw_bool_prop_icon(layout, data, property_name, icon_true, icon_false, emboss=False):
@@ -60,6 +59,73 @@ class NODE_PT_personal_settings(Panel):
         col.prop(prefs.view, "show_developer_ui")
 
 
+class InterfaceLayoutCache:
+    """
+    Per-tree cache of how a group's interface is laid out in the Group Descriptions panel.
+    Rows only hold indices (into items_tree and into the node's sockets), so that no RNA references are kept.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    def clear(self):
+        self.entries.clear()
+
+    def invalidate(self, tree):
+        self.entries.pop(tree, None)
+
+    @staticmethod
+    def sort_function(item):
+        return item.in_out if hasattr(item, "in_out") else item.item_type
+
+    @classmethod
+    def build(cls, items_tree):
+        items = sorted(enumerate(items_tree), key=lambda pair: cls.sort_function(pair[1]))
+        sections = []
+
+        for k, v in itertools.groupby(items, key=lambda pair: cls.sort_function(pair[1])):
+            # Each row is (draw separator before it, index in items_tree, index of the node's socket)
+            rows = []
+
+            if k == "PANEL":
+                rows.extend((False, item_index, None) for item_index, _ in v)
+            else:
+                i = 0
+                for sub_k, sub_v in itertools.groupby(v, key=lambda pair: pair[1].parent):
+                    # Check if base panel, which has no parents
+                    separator = sub_k.parent is not None
+
+                    for n, (item_index, _) in enumerate(sub_v):
+                        rows.append((separator and n == 0, item_index, i))
+                        i += 1
+
+            sections.append((k, tuple(rows)))
+
+        return tuple(sections)
+
+    @staticmethod
+    def signature(items_tree):
+        # Interface edits the depsgraph doesn't report (reordering, moving between panels) change which item
+        # sits at each index. Names aren't part of it, since prop() reads them at draw time
+        return tuple(items_tree)
+
+    def get(self, tree):
+        items_tree = tree.interface.items_tree
+        signature = self.signature(items_tree)
+
+        entry = self.entries.get(tree)
+        if entry is None or entry[0] != signature:
+            entry = (signature, self.build(items_tree))
+            self.entries[tree] = entry
+
+        return entry[1]
+
+
+interface_layout_cache = InterfaceLayoutCache()
+utils.tree_update_callbacks.append(interface_layout_cache.invalidate)
+utils.data_reload_callbacks.append(interface_layout_cache.clear)
+
+
 class NODE_PT_nodegroup_names_and_descriptions(Panel):
     bl_label = "Group Descriptions"
     bl_category = "Node"
@@ -70,18 +136,17 @@ class NODE_PT_nodegroup_names_and_descriptions(Panel):
     @classmethod
     @return_false_when(AttributeError)
     def poll(cls, context):
-        return context.active_node.select and context.active_node.node_tree is not None
+        active_node = context.active_node
+        return active_node.select and active_node.node_tree is not None and hasattr(active_node.node_tree, "interface")
 
     def draw(self, context):
         layout = self.layout
         layout.column(align=True)
         active_node = context.active_node
         tree = active_node.node_tree
+        items_tree = tree.interface.items_tree
 
-        sort_function = lambda i: i.in_out if hasattr(i, "in_out") else i.item_type
-        items_tree = sorted(tree.interface.items_tree, key=sort_function)
-
-        for k, v in itertools.groupby(items_tree, key=sort_function):
+        for k, rows in interface_layout_cache.get(tree):
             row = layout.row()
             split = row.split(factor=0.3)
             col1 = split.column()
@@ -90,30 +155,23 @@ class NODE_PT_nodegroup_names_and_descriptions(Panel):
             col1.label(text=f"{k.title()}:")
             col2.label(text="Description:")
 
-            if k == "PANEL":
-                for item in v:
-                    col1.prop(item, "name", icon_only=True)
-                    col2.prop(item, "description", icon_only=True)
-            else:
-                i = 0
-                for sub_k, sub_v in itertools.groupby(v, key=lambda i: i.parent):
-                    # Check if base panel, which has no parents
-                    if sub_k.parent is not None:
-                        col1.separator(factor=0.5)
-                        col2.separator(factor=0.5)
+            sockets = active_node.inputs if k == "INPUT" else active_node.outputs
 
-                    for item in sub_v:
-                        row = col1.row()
-                        if k == "INPUT":
-                            corresponding_socket = active_node.inputs[i]
-                        else:
-                            corresponding_socket = active_node.outputs[i]
+            for separator, item_index, socket_index in rows:
+                item = items_tree[item_index]
 
-                        row.template_node_socket(color=corresponding_socket.draw_color_simple())
-                        row.prop(item, "name", icon_only=True)
-                        col2.prop(item, "description", icon_only=True)
+                if separator:
+                    col1.separator(factor=0.5)
+                    col2.separator(factor=0.5)
 
-                        i += 1
+                if socket_index is None:
+                    col1.prop(item, "name", icon_only=True)
+                else:
+                    row = col1.row()
+                    row.template_node_socket(color=sockets[socket_index].draw_color_simple())
+                    row.prop(item, "name", icon_only=True)
+
+                col2.prop(item, "description", icon_only=True)
 
 
 class NODE_PT_menu_switch_all_descriptions(Panel):
@@ -154,6 +212,7 @@ class NODE_PT_group_utils(Panel):
         layout.prop(prefs, "unhide_virtual_sockets")
         layout.operator("node.hide_unused_sockets")
         layout.operator("node.pin_editor")
+        layout.operator("node.select_overlapping_nodes")
 
 
 class NODE_PT_node_info(Panel):
@@ -204,6 +263,50 @@ class NODE_PT_node_info(Panel):
             col2.label(text=prop_value)
             col3.operator("node.copy_to_clipboard", text="", icon="COPYDOWN").attribute = prop_value
 
+        if context.preferences.view.show_developer_ui:
+            cache = utils.poll_cache
+            col1.label(text="poll cache")
+            col2.label(text=f"{cache.hits} hits / {cache.misses} misses ({cache.hit_rate:.0%})")
+
+
+class NODE_PT_operator_profile(Panel):
+    bl_label = "Operator Profile"
+    bl_category = "Node"
+    bl_region_type = "UI"
+    bl_space_type = "NODE_EDITOR"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    shown_runs = 10
+
+    def draw(self, context):
+        layout = self.layout
+        prefs = fetch_user_preferences()
+        layout.prop(prefs, "enable_profiling")
+
+        history = profiling.history
+        if not history:
+            layout.label(text="No operator runs recorded")
+            return
+
+        col = layout.column(align=True)
+        col.label(text="Last Runs:")
+        for record in reversed(tuple(history)[-self.shown_runs :]):
+            row = col.row()
+            row.label(text=record.operator)
+            row.label(text=f"{record.wall_time * 1000:.1f}ms")
+            row.label(text=f"+{record.nodes_created}/-{record.nodes_removed} nodes")
+
+        col = layout.column(align=True)
+        col.label(text="Per Operator (p50 / p90 / max):")
+        for operator, stats in sorted(profiling.operator_statistics().items()):
+            row = col.row()
+            row.label(text=f"{operator} ({stats['runs']})")
+            row.label(text=f"{stats['p50'] * 1000:.1f} / {stats['p90'] * 1000:.1f} / {stats['max'] * 1000:.1f}ms")
+
+        row = layout.row(align=True)
+        row.operator("node.export_operator_profile", icon="EXPORT")
+        row.operator("node.clear_operator_profile", text="", icon="TRASH")
+
 
 class NODE_PT_node_coordinates(Panel):
     bl_label = "Node Coordinates"
@@ -270,6 +373,8 @@ class NODE_PT_asset_operators(Panel):
         row = layout.row(align=True)
         row.operator("node.multiple_make_local_all")
 
+        layout.operator("node.batch_asset_operation", icon="ASSET_MANAGER")
+
 
 def draw_personal_settings(self, context):
     self.layout.popover(panel="NODE_PT_personal_settings", text="", icon="PREFERENCES")
@@ -324,7 +429,10 @@ class NODE_PT_reroutes_to_switch(Panel):
 
         prefs.draw_enum_property(layout, "switch_type")
         prefs.draw_enum_property(layout, "reroute_merge_type")
-        layout.prop(prefs, "switch_count")
+        if prefs.reroute_merge_type == "SPATIAL":
+            layout.prop(prefs, "reroute_cluster_size")
+        else:
+            layout.prop(prefs, "switch_count")
 
         layout.operator("node.merge_reroutes_to_switch")
         layout.operator("node.convert_switch_type")
@@ -375,7 +483,7 @@ class NODE_PT_replace_group(Panel):
     @classmethod
     def poll(cls, context):
         active_node = context.active_node
-        return hasattr(active_node, "node_tree") and active_node.select
+        return getattr(active_node, "node_tree", None) is not None and active_node.select
 
     def draw(self, context):
         layout = self.layout
@@ -384,7 +492,22 @@ class NODE_PT_replace_group(Panel):
         wm = context.window_manager
         layout.prop(wm, "nodegroup_to_replace", text="")
         layout.prop(prefs, "show_hidden_nodegroups")
-        layout.operator("NODE_OT_batch_replace_group")
+        row = layout.row(align=True)
+        row.operator("NODE_OT_batch_replace_group")
+        row.operator_menu_enum("NODE_OT_batch_replace_group", "scope", text="", icon="DOWNARROW_HLT")
+
+        tree = context.active_node.node_tree
+        scan = groups.duplicate_scan.get(tree)
+
+        col = layout.column(align=True)
+        if scan is not None:
+            key, identical_count = scan
+            col.label(text=f"Fingerprint: {key[:10]}", icon="NODETREE")
+            col.label(text=f"Identical Groups: {identical_count}")
+
+        usage_index = groups.usage_index
+        col.label(text=f"Instances: {usage_index.instance_count(tree)} in {len(usage_index.users_of(tree))} groups")
+        layout.operator("node.list_duplicate_groups")
 
 
 if bpy.app.version >= (4, 3, 0):
@@ -392,9 +515,10 @@ if bpy.app.version >= (4, 3, 0):
         NODE_PT_personal_settings,
         NODE_PT_group_utils,
         NODE_PT_node_info,
+        NODE_PT_operator_profile,
         NODE_PT_asset_operators,
         # NODE_PT_node_coordinates,
-        # NODE_PT_nodegroup_names_and_descriptions,
+        NODE_PT_nodegroup_names_and_descriptions,
         NODE_PT_object_data_selector,
         NODE_PT_reroutes_to_switch,
         NODE_PT_math_node_convert,
@@ -406,9 +530,10 @@ else:
         NODE_PT_personal_settings,
         NODE_PT_group_utils,
         NODE_PT_node_info,
+        NODE_PT_operator_profile,
         NODE_PT_asset_operators,
         # NODE_PT_node_coordinates,
-        # NODE_PT_nodegroup_names_and_descriptions,
+        NODE_PT_nodegroup_names_and_descriptions,
         NODE_PT_object_data_selector,
         NODE_PT_reroutes_to_switch,
         NODE_PT_group_inputs,
@@ -416,17 +541,6 @@ else:
     )
 
 
-def replace_nodegroup_poll(self, object):
-    tree = bpy.context.space_data.edit_tree
-    group = object
-
-    return (
-        group.bl_idname == tree.bl_idname
-        and not group.contains_tree(tree)
-        and (not group.name.startswith(".") or fetch_user_preferences("show_hidden_nodegroups"))
-    )
-
-
 def register():
     if bpy.app.version >= (4, 2, 0):
         if hasattr(NODE_PT_menu_switch_all_descriptions, "bl_parent_id"):
@@ -447,11 +561,6 @@ def register():
 
     bpy.types.NodeTree.test_object_prop = bpy.props.StringProperty(update=data_selector_callback)
 
-    bpy.types.WindowManager.nodegroup_to_replace = bpy.props.PointerProperty(
-        name="Group to Replace",
-        type=bpy.types.NodeTree,
-        poll=replace_nodegroup_poll,
-    )
     # bpy.types.NodeTree.test_object_prop = PointerProperty(type=bpy.types.Object, update=data_selector_callback)
     # bpy.types.NodeTree.test_object_prop = PointerProperty(type=bpy.types.Object, poll=lambda self, object: object.type == 'LIGHT')
 
@@ -465,7 +574,6 @@ def unregister():
 
     bpy.types.NODE_HT_header.remove(draw_personal_settings)
     del bpy.types.NodeTree.test_object_prop
-    del bpy.types.WindowManager.nodegroup_to_replace
 
 
 if __name__ == "__main__":
@@ -2,12 +2,18 @@ import bpy
 import ctypes
 import platform
 import itertools
+import math
 
+from collections import defaultdict
+from contextlib import contextmanager
 from functools import wraps
 from mathutils import Vector
 
+from bpy.app.handlers import persistent
 from bpy.types import Node, NodeSocketVirtual
 
+# NumPy is imported inside the geometry and bulk-read functions that use it,
+# since it's by far the heaviest import and most sessions never lay out nodes
 
 weird_offset = 10
 reroute_width = 10
@@ -61,6 +67,75 @@ def return_false_when(*args, **_):
     return decorator
 
 
+class PollCache:
+    """
+    Keeps the last result of each cached poll function, along with the signature it was computed for.
+    The poll only runs again once its signature changes.
+    """
+
+    def __init__(self):
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.results.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def lookup(self, key, signature, poll):
+        cached = self.results.get(key)
+        if cached is not None and cached[0] == signature:
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        result = poll()
+        self.results[key] = (signature, result)
+        return result
+
+
+poll_cache = PollCache()
+
+# Bumped by the depsgraph handler below, used as a cheap "something changed" signal
+update_generation = 0
+
+
+def tree_signature(context):
+    tree = context.space_data.edit_tree
+    return (tree.as_pointer(), len(tree.nodes), update_generation)
+
+
+def selection_signature(context):
+    # Hashing RNA structs only uses their pointers, so no attributes are accessed here
+    return (*tree_signature(context), hash(context.active_node), hash(tuple(context.selected_nodes)))
+
+
+def cached_poll(signature_func):
+    """Caches a poll function's result until signature_func(context) changes"""
+
+    def decorator(poll):
+        @wraps(poll)
+        def wrapper(cls, context):
+            try:
+                signature = signature_func(context)
+            except AttributeError:
+                return poll(cls, context)
+
+            return poll_cache.lookup(cls, signature, lambda: poll(cls, context))
+
+        return wrapper
+
+    return decorator
+
+
 def transfer_properties(source, target, props):
     for prop_name in props:
         setattr(target, prop_name, getattr(source, prop_name))
@@ -153,16 +228,437 @@ def get_bottom(node):
         return node.location.y - get_height(node)
 
 
+class NodeGeometry:
+    """
+    Snapshot of the location and size of a set of nodes, read from RNA in a single pass.
+    Operators that move or resize nodes should go through translate()/set_location(),
+    or call invalidate() on the affected nodes so the snapshot is re-read.
+
+    When given the node collection the nodes belong to (e.g. tree.nodes), either as nodes or as collection,
+    the numeric columns are read in bulk with foreach_get() and only the needed rows are kept.
+    Writes made inside deferred_writes() are then sent back with a single foreach_set().
+    """
+
+    def __init__(self, nodes, collection=None):
+        import numpy as np
+
+        if collection is None and is_bulk_collection(nodes):
+            collection = nodes
+        self.collection = collection
+
+        if nodes is collection:
+            self.nodes = tuple(nodes)
+        else:
+            self.nodes = tuple(dict.fromkeys(nodes))
+        self._index = None
+
+        # Position of each row within collection, None when every node of the collection is a row, in order
+        self._positions = None
+
+        count = len(self.nodes)
+        self.location = np.zeros((count, 2))
+        self.width = np.zeros(count)
+        self.dimensions = np.zeros((count, 2))
+        self.height = np.full(count, np.nan)
+        self.is_hidden = np.zeros(count, dtype=bool)
+
+        # Node type is only resolved for the rows that actually need it,
+        # since it can't be read in bulk (-1: unknown, 0: regular node, 1: reroute)
+        self.node_type = np.full(count, -1, dtype=np.int8)
+
+        self._defer_writes = False
+        self._dirty = set()
+
+        if self.collection is None or not self._read_bulk():
+            for i, node in enumerate(self.nodes):
+                self._read(i, node)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.index
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {node: i for i, node in enumerate(self.nodes)}
+        return self._index
+
+    def _read(self, i, node):
+        self.location[i] = node.location
+        self.width[i] = node.width
+        self.dimensions[i] = node.dimensions
+        self.is_hidden[i] = node.hide
+        self.node_type[i] = -1
+        self.height[i] = math.nan
+
+    def _read_bulk(self):
+        import numpy as np
+
+        if len(self.nodes) == 0:
+            return True
+
+        collection = self.collection
+        total = len(collection)
+
+        try:
+            location = read_bulk_attribute(collection, "location", total, size=2)
+            width = read_bulk_attribute(collection, "width", total)
+            dimensions = read_bulk_attribute(collection, "dimensions", total, size=2)
+            is_hidden = read_bulk_attribute(collection, "hide", total, dtype=bool)
+        except (AttributeError, RuntimeError, TypeError):
+            return False
+
+        if len(self.nodes) == total and self.nodes == tuple(collection):
+            rows = slice(None)
+        else:
+            # Only hashes the node pointers, no properties are read through RNA here
+            positions = {node: i for i, node in enumerate(collection)}
+            rows = self._positions = np.fromiter((positions[node] for node in self.nodes), dtype=np.intp)
+
+        self.location[:] = location[rows]
+        self.width[:] = width[rows]
+        self.dimensions[:] = dimensions[rows]
+        self.is_hidden[:] = is_hidden[rows]
+        return True
+
+    def invalidate(self, nodes=None):
+        if nodes is None:
+            nodes = self.nodes
+        elif isinstance(nodes, Node):
+            nodes = (nodes,)
+
+        for node in nodes:
+            self._read(self.index[node], node)
+
+    def rows(self, nodes=None):
+        import numpy as np
+
+        if nodes is None:
+            return np.arange(len(self.nodes))
+        if isinstance(nodes, np.ndarray):
+            return np.flatnonzero(nodes) if nodes.dtype == bool else nodes
+        if isinstance(nodes, Node):
+            nodes = (nodes,)
+
+        index = self.index
+        return np.fromiter((index[node] for node in nodes), dtype=np.intp)
+
+    def reroute_mask(self, rows):
+        node_types = self.node_type[rows]
+        for i in rows[node_types < 0]:
+            self.node_type[i] = self.nodes[i].bl_static_type == "REROUTE"
+
+        return self.node_type[rows] == 1
+
+    def heights(self, rows):
+        import numpy as np
+
+        missing = rows[np.isnan(self.height[rows])]
+
+        for i in missing:
+            dim_x, dim_y = self.dimensions[i]
+            if dim_x != 0:
+                self.height[i] = get_width(self.nodes[i]) * dim_y / dim_x
+            else:
+                self.height[i] = get_height(self.nodes[i])
+
+        return self.height[rows]
+
+    def lefts(self, nodes=None):
+        rows = self.rows(nodes)
+        return self.location[rows, 0]
+
+    def centers(self, nodes=None):
+        import numpy as np
+
+        rows = self.rows(nodes)
+        x = self.location[rows, 0]
+        return np.where(self.reroute_mask(rows), x, x + 0.5 * self.width[rows])
+
+    def rights(self, nodes=None):
+        import numpy as np
+
+        rows = self.rows(nodes)
+        x = self.location[rows, 0]
+        return np.where(self.reroute_mask(rows), x, x + self.width[rows])
+
+    def _vertical(self, rows, hidden_factor, visible_factor):
+        import numpy as np
+
+        y = self.location[rows, 1]
+        is_reroute = self.reroute_mask(rows)
+
+        if is_reroute.all():
+            return y.copy()
+
+        heights = np.zeros(len(rows))
+        heights[~is_reroute] = self.heights(rows[~is_reroute])
+
+        hidden = y + (hidden_factor * heights) - weird_offset
+        visible = y + (visible_factor * heights)
+
+        return np.where(is_reroute, y, np.where(self.is_hidden[rows], hidden, visible))
+
+    def tops(self, nodes=None):
+        return self._vertical(self.rows(nodes), hidden_factor=0.5, visible_factor=0.0)
+
+    def middles(self, nodes=None):
+        return self._vertical(self.rows(nodes), hidden_factor=0.0, visible_factor=-0.5)
+
+    def bottoms(self, nodes=None):
+        return self._vertical(self.rows(nodes), hidden_factor=-0.5, visible_factor=-1.0)
+
+    def bounds(self, nodes=None):
+        rows = self.rows(nodes)
+        if len(rows) <= 0:
+            return 0, 0, 0, 0
+
+        min_x = float(self.lefts(rows).min())
+        max_x = float(self.rights(rows).max())
+        min_y = float(self.bottoms(rows).min())
+        max_y = float(self.tops(rows).max())
+
+        return min_x, max_x, min_y, max_y
+
+    def _write(self, rows):
+        if self._defer_writes:
+            self._dirty.update(rows.tolist())
+            return
+
+        for i in rows:
+            self.nodes[i].location = self.location[i]
+
+    def set_location(self, nodes, x=None, y=None):
+        rows = self.rows(nodes)
+        if x is not None:
+            self.location[rows, 0] = x
+        if y is not None:
+            self.location[rows, 1] = y
+
+        self._write(rows)
+
+    def translate(self, offset_x, offset_y, nodes=None):
+        rows = self.rows(nodes)
+        self.location[rows] += (offset_x, offset_y)
+        self._write(rows)
+
+    @contextmanager
+    def deferred_writes(self):
+        """Batches location writes, sending them back to RNA once the block exits"""
+        self._defer_writes = True
+        try:
+            yield self
+        finally:
+            self._defer_writes = False
+            self.flush()
+
+    def flush(self):
+        import numpy as np
+
+        if not self._dirty:
+            return
+
+        rows = np.fromiter(self._dirty, dtype=np.intp)
+        self._dirty.clear()
+
+        # A single bulk write is only worth it when a sizable part of the collection moved
+        collection = self.collection
+        if collection is not None and len(rows) * 4 >= len(collection):
+            try:
+                # Current locations are re-read, so nodes moved since the snapshot aren't put back where they were
+                total = len(collection)
+                locations = read_bulk_attribute(collection, "location", total, size=2)
+                positions = rows if self._positions is None else self._positions[rows]
+                locations[positions] = self.location[rows]
+
+                collection.foreach_set("location", locations.ravel())
+                return
+            except (AttributeError, RuntimeError, TypeError):
+                pass
+
+        self._write(rows)
+
+
+class SpatialGrid:
+    """
+    Uniform grid of node rectangles (left, right, bottom, top), for region, nearest-node and overlap queries
+    without scanning every node. Items are either nodes or plain rectangles added with insert().
+    """
+
+    def __init__(self, cell_size=200.0):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+        self.rects = []
+        self.items = []
+
+        # Extent of the occupied cells, as (min_x, max_x, min_y, max_y)
+        self.cell_bounds = None
+
+    @classmethod
+    def from_geometry(cls, geometry, nodes=None, cell_size=None):
+        import numpy as np
+
+        rows = geometry.rows(nodes)
+        lefts, rights = geometry.lefts(rows), geometry.rights(rows)
+        bottoms, tops = geometry.bottoms(rows), geometry.tops(rows)
+
+        if cell_size is None:
+            # Cells around the typical node size keep both the number of cells per node and nodes per cell low
+            sizes = np.maximum(rights - lefts, tops - bottoms)
+            cell_size = float(np.median(sizes)) if len(sizes) else 200.0
+            cell_size = max(cell_size, 20.0)
+
+        grid = cls(cell_size=cell_size)
+        for i, rect in zip(rows, zip(lefts.tolist(), rights.tolist(), bottoms.tolist(), tops.tolist())):
+            grid.insert(rect, geometry.nodes[i])
+
+        return grid
+
+    def __len__(self):
+        return len(self.rects)
+
+    def cell_range(self, rect):
+        left, right, bottom, top = rect
+        size = self.cell_size
+        return (
+            range(math.floor(left / size), math.floor(right / size) + 1),
+            range(math.floor(bottom / size), math.floor(top / size) + 1),
+        )
+
+    def insert(self, rect, item=None):
+        index = len(self.rects)
+        self.rects.append(rect)
+        self.items.append(item)
+
+        x_range, y_range = self.cell_range(rect)
+        for cell_x in x_range:
+            for cell_y in y_range:
+                self.cells[(cell_x, cell_y)].append(index)
+
+        if self.cell_bounds is None:
+            self.cell_bounds = (x_range[0], x_range[-1], y_range[0], y_range[-1])
+        else:
+            min_x, max_x, min_y, max_y = self.cell_bounds
+            self.cell_bounds = (
+                min(min_x, x_range[0]),
+                max(max_x, x_range[-1]),
+                min(min_y, y_range[0]),
+                max(max_y, y_range[-1]),
+            )
+
+        return index
+
+    @staticmethod
+    def intersects(a, b):
+        return a[0] < b[1] and b[0] < a[1] and a[2] < b[3] and b[2] < a[3]
+
+    def overlapping(self, rect):
+        x_range, y_range = self.cell_range(rect)
+
+        for cell_x in x_range:
+            for cell_y in y_range:
+                for index in self.cells.get((cell_x, cell_y), ()):
+                    if self.intersects(rect, self.rects[index]):
+                        yield index
+
+    def query(self, rect):
+        """Indices of every rectangle overlapping rect"""
+        return set(self.overlapping(rect))
+
+    def is_free(self, rect):
+        return next(self.overlapping(rect), None) is None
+
+    def free_offset(self, rect, step_x, step_y, attempts=8):
+        """
+        Offset (dx, dy) that moves rect clear of every rectangle in the grid, or None if none was found.
+        Each column of candidates tries the original height, then one step below and above it,
+        before moving a further step_x along.
+        """
+        left, right, bottom, top = rect
+
+        for column in range(attempts):
+            dx = column * step_x
+            for dy in (0.0, -step_y, step_y):
+                if self.is_free((left + dx, right + dx, bottom + dy, top + dy)):
+                    return dx, dy
+
+        return None
+
+    def distance(self, index, x, y):
+        left, right, bottom, top = self.rects[index]
+        dx = max(left - x, 0.0, x - right)
+        dy = max(bottom - y, 0.0, y - top)
+        return math.hypot(dx, dy)
+
+    def nearest(self, x, y, max_distance=math.inf):
+        """Index of the rectangle closest to (x, y), searching outward ring by ring"""
+        if not self.rects:
+            return None
+
+        size = self.cell_size
+        center_x, center_y = math.floor(x / size), math.floor(y / size)
+        best, best_distance = None, max_distance
+
+        # Bounded by the grid extent, so a far away point still terminates
+        min_x, max_x, min_y, max_y = self.cell_bounds
+        max_ring = max(center_x - min_x, max_x - center_x, center_y - min_y, max_y - center_y, 0)
+
+        for ring in range(max_ring + 1):
+            # Anything in this ring or beyond is at least (ring - 1) cells away
+            if best is not None and (ring - 1) * size > best_distance:
+                break
+
+            for cell_x in range(center_x - ring, center_x + ring + 1):
+                for cell_y in range(center_y - ring, center_y + ring + 1):
+                    if max(abs(cell_x - center_x), abs(cell_y - center_y)) != ring:
+                        continue
+
+                    for index in self.cells.get((cell_x, cell_y), ()):
+                        distance = self.distance(index, x, y)
+                        if distance < best_distance:
+                            best, best_distance = index, distance
+
+        return best
+
+    def overlapping_pairs(self):
+        """Every pair of overlapping rectangles, as (lower index, higher index)"""
+        pairs = set()
+        rects = self.rects
+
+        for indices in self.cells.values():
+            for n, a in enumerate(indices):
+                for b in indices[n + 1 :]:
+                    if a != b and self.intersects(rects[a], rects[b]):
+                        pairs.add((min(a, b), max(a, b)))
+
+        return pairs
+
+
+def is_bulk_collection(data):
+    return hasattr(data, "foreach_get") and hasattr(data, "foreach_set")
+
+
+def read_bulk_attribute(collection, attribute, count, size=1, dtype=None):
+    import numpy as np
+
+    if dtype is None:
+        dtype = np.float32
+    buffer = np.empty(count * size, dtype=dtype)
+    collection.foreach_get(attribute, buffer)
+
+    if size > 1:
+        return buffer.reshape(count, size)
+    return buffer
+
+
 def get_bounds(nodes):
     if len(nodes) <= 0:
         return 0, 0, 0, 0
 
-    min_x = min(get_left(node) for node in nodes)
-    max_x = max(get_right(node) for node in nodes)
-    min_y = min(get_bottom(node) for node in nodes)
-    max_y = max(get_top(node) for node in nodes)
-
-    return min_x, max_x, min_y, max_y
+    nodes = tuple(nodes)
+    return NodeGeometry(nodes, collection=nodes[0].id_data.nodes).bounds()
 
 
 def get_bounds_midpoint(nodes):
@@ -192,8 +688,130 @@ def fetch_active_nodetree(context):
         return node_tree
 
 
-def transfer_node_links(tree, source, destination):
-    for link in source.links:
+class LinkIndex:
+    """
+    Adjacency index of a tree's links, built from a single pass over tree.links.
+    Links added or removed through new()/remove()/remove_node() keep the index up to date,
+    so operators doing several edits in a row don't need to rebuild it.
+
+    When only a few nodes get rewired, passing them as nodes indexes just their links,
+    which is far cheaper than reading every link of a large tree.
+    """
+
+    # socket.links scans every link of the tree, so past this many nodes one pass over tree.links is cheaper
+    partial_build_limit = 4
+
+    def __init__(self, tree, nodes=None):
+        self.tree = tree
+        self.endpoints = {}
+        self.incoming = defaultdict(list)
+        self.outgoing = defaultdict(list)
+        self.node_links = defaultdict(list)
+
+        if nodes is not None:
+            nodes = tuple(nodes)
+
+        if nodes is None or len(nodes) > self.partial_build_limit:
+            links = tree.links
+        else:
+            links = dict.fromkeys(
+                link
+                for node in nodes
+                for socket in (*node.inputs, *node.outputs)
+                if socket.is_linked
+                for link in socket.links
+            )
+
+        for link in links:
+            self.add(link)
+
+    def __len__(self):
+        return len(self.endpoints)
+
+    def add(self, link):
+        from_socket, to_socket = link.from_socket, link.to_socket
+        from_node, to_node = link.from_node, link.to_node
+
+        self.endpoints[link] = (from_socket, to_socket, from_node, to_node)
+        self.outgoing[from_socket].append(link)
+        self.incoming[to_socket].append(link)
+        self.node_links[from_node].append(link)
+        if to_node != from_node:
+            self.node_links[to_node].append(link)
+
+    def discard(self, link):
+        endpoints = self.endpoints.pop(link, None)
+        if endpoints is None:
+            return
+
+        from_socket, to_socket, from_node, to_node = endpoints
+        self.outgoing[from_socket].remove(link)
+        self.incoming[to_socket].remove(link)
+        self.node_links[from_node].remove(link)
+        if to_node != from_node:
+            self.node_links[to_node].remove(link)
+
+    def links(self, socket):
+        """Equivalent of socket.links, without the linear scan over tree.links"""
+        return (*self.incoming.get(socket, ()), *self.outgoing.get(socket, ()))
+
+    def is_linked(self, socket):
+        return bool(self.incoming.get(socket) or self.outgoing.get(socket))
+
+    def links_of_node(self, node):
+        return tuple(self.node_links.get(node, ()))
+
+    def new(self, from_socket, to_socket):
+        # Linking into an occupied single-input socket replaces the existing link,
+        # and Blender also replaces an identical link into a multi-input socket instead of adding a second one
+        for link in tuple(self.incoming.get(to_socket, ())):
+            if not to_socket.is_multi_input or self.endpoints[link][0] == from_socket:
+                self.discard(link)
+
+        link = self.tree.links.new(from_socket, to_socket)
+        self.add(link)
+        return link
+
+    def remove(self, link):
+        self.discard(link)
+        self.tree.links.remove(link)
+
+    def remove_node(self, node):
+        for link in tuple(self.node_links.get(node, ())):
+            self.discard(link)
+
+        self.node_links.pop(node, None)
+        self.tree.nodes.remove(node)
+
+
+def embedded_node_trees(blend_data):
+    """Node trees owned by other datablocks (materials, worlds, scenes, ...), which aren't part of node_groups"""
+    collections = ("materials", "worlds", "lights", "textures", "linestyles", "scenes")
+
+    for collection_name in collections:
+        for data_block in getattr(blend_data, collection_name, ()):
+            tree = getattr(data_block, "node_tree", None)
+            if tree is not None:
+                yield tree
+
+
+def linked_sockets(tree):
+    """Every socket of tree with at least one link, from a single pass over tree.links"""
+    linked = set()
+    for link in tree.links:
+        linked.add(link.from_socket)
+        linked.add(link.to_socket)
+
+    return linked
+
+
+def transfer_node_links(tree, source, destination, link_index=None):
+    if link_index is None:
+        links, new_link = source.links, tree.links.new
+    else:
+        links, new_link = link_index.links(source), link_index.new
+
+    for link in links:
         if source.is_output:
             link_start = destination
             link_end = link.to_socket
@@ -201,35 +819,39 @@ def transfer_node_links(tree, source, destination):
             link_start = link.from_socket
             link_end = destination
 
-        tree.links.new(link_start, link_end)
+        new_link(link_start, link_end)
+
 
+def arrange_along_column(nodes, spacing, geometry=None):
+    import numpy as np
 
-def arrange_along_column(nodes, spacing):
-    def spacing_func(a, b):
-        return a - (get_height(b) + spacing)
+    if geometry is None:
+        geometry = NodeGeometry(nodes)
 
-    first_node = next(iter(nodes))
-    positions = itertools.accumulate(nodes, func=spacing_func, initial=get_height(first_node))
+    rows = geometry.rows(nodes)
+    heights = geometry.heights(rows)
+    positions = heights[0] - np.concatenate(((0.0,), np.cumsum(heights + spacing)[:-1]))
 
-    for node, pos in zip(nodes, positions):
-        node.location.y = pos
+    geometry.set_location(rows, y=positions)
 
 
-def align_by_bounding_box(target_nodes, nodes_to_move):
+def align_by_bounding_box(target_nodes, nodes_to_move, geometry=None):
     if isinstance(target_nodes, Node):
         target_nodes = (target_nodes,)
     if isinstance(nodes_to_move, Node):
         nodes_to_move = (nodes_to_move,)
 
-    target = get_bounds(target_nodes)
-    current_pos = get_bounds(nodes_to_move)
+    if geometry is None:
+        geometry = NodeGeometry(itertools.chain(target_nodes, nodes_to_move))
+
+    target = geometry.bounds(target_nodes)
+    current_pos = geometry.bounds(nodes_to_move)
 
     offset_x = 0.5 * (target[0] + target[1]) - 0.5 * (current_pos[0] + current_pos[1])
     offset_y = 0.5 * (target[2] + target[3]) - 0.5 * (current_pos[2] + current_pos[3])
 
-    for node in nodes_to_move:
-        node.location.x += offset_x
-        node.location.y += offset_y
+    with geometry.deferred_writes():
+        geometry.translate(offset_x, offset_y, nodes=nodes_to_move)
 
 
 class StructBase(ctypes.Structure):
@@ -255,6 +877,10 @@ class StructBase(ctypes.Structure):
 
     @classmethod
     def get_fields(cls, tar):
+        # Layouts are only built on first use, which keeps them out of the add-on's startup cost
+        if StructBase._subclasses:
+            StructBase._init_structs()
+
         return cls.from_address(tar.as_pointer())
 
 
@@ -308,12 +934,165 @@ class BNodeSocket(StructBase):
     runtime: ctypes.POINTER(BNodeSocketRuntimeHandle)
 
 
-def get_socket_location(sk):
+# None until the first socket read, then whether the BNodeSocket layout matched RNA
+socket_layout_valid = None
+
+
+def link_pointer_matches(tree):
+    """
+    Compares bNodeSocket.link of a linked input against RNA. The field comes after short_label and the
+    platform-dependent padding, so it catches misplaced offsets before runtime is ever dereferenced.
+    Returns None if the tree has no suitable link.
+    """
+
+    for link in tree.links:
+        to_socket = link.to_socket
+        if not to_socket.is_multi_input:
+            return BNodeSocket.get_fields(to_socket).link == link.as_pointer()
+
+    return None
+
+
+def socket_location_is_plausible(sk):
+    """Whether the location read through runtime lies on the socket's node, or None if that can't be told"""
+    node = sk.node
+    if node.hide or sk.hide or not sk.enabled or node.dimensions.x == 0:
+        return None
+
+    origin = getattr(node, "location_absolute", None)
+    if origin is None:
+        if node.parent is not None:
+            return None
+        origin = node.location
+
+    scale = bpy.context.preferences.view.ui_scale
+    x, y = (value / scale for value in read_socket_location(sk))
+    width, height = node.dimensions.x / scale, node.dimensions.y / scale
+    margin = 50.0
+
+    # Also false for NaN, which is what garbage memory tends to look like as floats
+    on_x = origin.x - margin <= x <= origin.x + width + margin
+    on_y = origin.y - height - margin <= y <= origin.y + margin
+    return on_x and on_y
+
+
+def check_socket_layout(sk):
+    """
+    Checks the BNodeSocket mirror against RNA before its runtime pointer is trusted:
+    identifier and idname near the start of the struct, the link pointer near its end,
+    and, when the node has been drawn, that the location read back actually lies on the node.
+    """
+
+    global socket_layout_valid
+    if socket_layout_valid is None:
+        fields = BNodeSocket.get_fields(sk)
+        is_valid = (
+            fields.identifier.decode(errors="replace") == sk.identifier
+            and fields.idname.decode(errors="replace") == sk.bl_idname
+            and bool(fields.runtime)
+        )
+
+        link_check = link_pointer_matches(sk.id_data) if is_valid else False
+        if link_check is False:
+            socket_layout_valid = False
+        else:
+            location_check = socket_location_is_plausible(sk)
+            if location_check is not None:
+                socket_layout_valid = location_check
+            elif link_check is None:
+                # Nothing past the padding could be checked, so the fast path isn't trusted yet
+                raise RuntimeError("BNodeSocket layout can't be verified on a tree without links or drawn nodes")
+            else:
+                socket_layout_valid = True
+
+    if not socket_layout_valid:
+        raise RuntimeError(f"BNodeSocket layout does not match Blender {bpy.app.version_string}")
+
+
+def read_socket_location(sk):
     if (not sk.enabled) and (sk.hide):
-        return Vector((0, 0))
+        return (0.0, 0.0)
+
+    return BNodeSocket.get_fields(sk).runtime.contents.location[:]
+
+
+def get_socket_location(sk):
+    check_socket_layout(sk)
+    return Vector(read_socket_location(sk)) / bpy.context.preferences.view.ui_scale
+
+
+def get_socket_locations(data):
+    """
+    Reads the drawn location of many sockets at once, into an (n, 2) float array.
+    Accepts a node, a node tree, or an iterable of sockets, and returns the sockets alongside their locations.
+    """
+    import numpy as np
+
+    if isinstance(data, Node):
+        sockets = (*data.inputs, *data.outputs)
+    elif hasattr(data, "nodes"):
+        sockets = tuple(sk for node in data.nodes for sk in (*node.inputs, *node.outputs))
+    else:
+        sockets = tuple(data)
+
+    locations = np.zeros((len(sockets), 2), dtype=np.float32)
+    if not sockets:
+        return sockets, locations
+
+    check_socket_layout(sockets[0])
+    for i, sk in enumerate(sockets):
+        locations[i] = read_socket_location(sk)
+
+    locations /= bpy.context.preferences.view.ui_scale
+    return sockets, locations
+
+
+# Other modules can append callbacks here to hear about tree edits and undo/reload events,
+# instead of each registering their own handlers
+tree_update_callbacks = []
+data_reload_callbacks = []
+
+
+@persistent
+def on_depsgraph_update(scene, depsgraph):
+    global update_generation
+    update_generation += 1
+
+    if not tree_update_callbacks:
+        return
+
+    for update in depsgraph.updates:
+        tree = update.id
+        if isinstance(tree, bpy.types.NodeTree):
+            for callback in tree_update_callbacks:
+                callback(tree.original)
+
+
+@persistent
+def on_data_reload(*_):
+    # RNA pointers can be reused after an undo step or file load
+    global update_generation
+    update_generation += 1
+    poll_cache.clear()
+
+    for callback in data_reload_callbacks:
+        callback()
+
+
+handlers = (
+    (bpy.app.handlers.depsgraph_update_post, on_depsgraph_update),
+    (bpy.app.handlers.undo_post, on_data_reload),
+    (bpy.app.handlers.redo_post, on_data_reload),
+    (bpy.app.handlers.load_post, on_data_reload),
+)
+
 
-    socket_location = BNodeSocket.get_fields(sk).runtime.contents.location[:]
-    return Vector(socket_location) / bpy.context.preferences.view.ui_scale
+def register():
+    for handler_list, handler in handlers:
+        handler_list.append(handler)
 
 
-StructBase._init_structs()
+def unregister():
+    for handler_list, handler in handlers:
+        if handler in handler_list:
+            handler_list.remove(handler)